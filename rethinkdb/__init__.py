@@ -12,6 +12,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import importlib
+
 from rethinkdb import errors, version
 
 # The builtins here defends against re-importing something obscuring `object`.
@@ -26,25 +28,21 @@ __version__ = version.VERSION
 
 
 class RethinkDB(builtins.object):
+    # The admin tools pull in optparse, multiprocessing and friends, so they
+    # are imported on first access instead of with the driver.
+    _tool_modules = ("_dump", "_export", "_import", "_index_rebuild", "_restore")
+    _loop_type_modules = {
+        "asyncio": "rethinkdb.asyncio_net.net_asyncio",
+        "gevent": "rethinkdb.gevent_net.net_gevent",
+        "tornado": "rethinkdb.tornado_net.net_tornado",
+        "trio": "rethinkdb.trio_net.net_trio",
+        "twisted": "rethinkdb.twisted_net.net_twisted",
+    }
+
     def __init__(self):
         super(RethinkDB, self).__init__()
 
-        from rethinkdb import (
-            _dump,
-            _export,
-            _import,
-            _index_rebuild,
-            _restore,
-            ast,
-            query,
-            net,
-        )
-
-        self._dump = _dump
-        self._export = _export
-        self._import = _import
-        self._index_rebuild = _index_rebuild
-        self._restore = _restore
+        from rethinkdb import ast, query, net
 
         # Re-export internal modules for backward compatibility
         self.ast = ast
@@ -61,31 +59,26 @@ class RethinkDB(builtins.object):
         self.set_loop_type(None)
 
     def set_loop_type(self, library=None):
-        if library == "asyncio":
-            from rethinkdb.asyncio_net import net_asyncio
-            self.connection_type = net_asyncio.Connection
-
-        if library == "gevent":
-            from rethinkdb.gevent_net import net_gevent
-            self.connection_type = net_gevent.Connection
-
-        if library == "tornado":
-            from rethinkdb.tornado_net import net_tornado
-            self.connection_type = net_tornado.Connection
-
-        if library == "trio":
-            from rethinkdb.trio_net import net_trio
-            self.connection_type = net_trio.Connection
-
-        if library == "twisted":
-            from rethinkdb.twisted_net import net_twisted
-            self.connection_type = net_twisted.Connection
+        module_name = self._loop_type_modules.get(library)
+        if module_name is not None:
+            module = importlib.import_module(module_name)
+            self.connection_type = module.Connection
 
         if library is None or self.connection_type is None:
             self.connection_type = self.net.DefaultConnection
 
         return
 
+    def __getattr__(self, name):
+        if name in self._tool_modules:
+            module = importlib.import_module("rethinkdb." + name)
+            setattr(self, name, module)
+            return module
+
+        raise AttributeError(
+            "'%s' object has no attribute '%s'" % (self.__class__.__name__, name)
+        )
+
     def connect(self, *args, **kwargs):
         return self.make_connection(self.connection_type, *args, **kwargs)
 
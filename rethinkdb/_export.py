@@ -529,7 +529,7 @@ def run_clients(options, workingDir, db_table_set):
         # If we were successful, make sure 100% progress is reported
         # (rows could have been deleted which would result in being done at less than 100%)
         if len(errors) == 0 and not interrupt_event.is_set() and not options.quiet:
-            utils_common.print_progress(1.0, indent=4)
+            utils_common.print_progress(1.0, indent=4, force=True)
 
         # Continue past the progress output line and print total rows processed
         def plural(num, text, plural_text):
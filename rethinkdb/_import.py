@@ -33,7 +33,7 @@ import signal
 import sys
 import time
 import traceback
-from multiprocessing.queues import Queue, SimpleQueue
+from multiprocessing.queues import SimpleQueue
 
 import six
 
@@ -1459,7 +1459,7 @@ def import_tables(options, sources, files_ignored=None):
         if progress_bar:
             progress_bar.join(progress_bar_sleep * 2)
             if not interrupt_event.is_set():
-                utils_common.print_progress(1, indent=2)
+                utils_common.print_progress(1, indent=2, force=True)
             if progress_bar.is_alive():
                 progress_bar.terminate()
 
@@ -1470,7 +1470,7 @@ def import_tables(options, sources, files_ignored=None):
         if not options.quiet:
             # if successful, make sure 100% progress is reported
             if len(errors) == 0 and not interrupt_event.is_set():
-                utils_common.print_progress(1.0, indent=2)
+                utils_common.print_progress(1.0, indent=2, force=True)
 
             # advance past the progress bar
             print("")
@@ -251,7 +251,7 @@ def rebuild_indexes(options):
 
     # Make sure the progress bar says we're done and get past the progress bar line
     if not options.quiet:
-        utils_common.print_progress(1.0)
+        utils_common.print_progress(1.0, force=True)
         print("")
 
 
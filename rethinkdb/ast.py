@@ -22,12 +22,14 @@ import base64
 import binascii
 import datetime
 import json
+import re
 import sys
 import threading
 
 from rethinkdb import ql2_pb2
 from rethinkdb.errors import (QueryPrinter, ReqlDriverCompileError,
                               ReqlDriverError, T)
+from rethinkdb.helpers import decode_utf8
 
 if sys.version_info < (3, 3):
     # python < 3.3 uses collections
@@ -36,8 +38,17 @@ else:
     # but collections is deprecated from python >= 3.3
     import collections.abc as collections
 
+try:
+    # optional, a much faster JSON parser than the json module
+    import orjson
+except ImportError:
+    orjson = None
+
 P_TERM = ql2_pb2.Term.TermType
 
+# searches buffers without copying them, unlike the `in` operator
+_PSEUDOTYPE_MARKER = re.compile(br"\$reql_type\$")
+
 try:
     unicode
 except NameError:
@@ -59,10 +70,7 @@ class Repl(object):
 
     @classmethod
     def get(cls):
-        if "repl" in cls.thread_data.__dict__:
-            return cls.thread_data.repl
-        else:
-            return None
+        return getattr(cls.thread_data, "repl", None)
 
     @classmethod
     def set(cls, conn):
@@ -71,8 +79,7 @@ class Repl(object):
 
     @classmethod
     def clear(cls):
-        if "repl" in cls.thread_data.__dict__:
-            del cls.thread_data.repl
+        cls.thread_data.__dict__.pop("repl", None)
         cls.repl_active = False
 
 
@@ -151,7 +158,9 @@ class RqlQuery(object):
                         "RqlQuery.run must be given a connection to run on."
                     )
 
-        return c._start(self, **global_optargs)
+        # The keyword arguments dict belongs to this call, so it is handed
+        # over as is instead of being unpacked into a new one
+        return c._start(self, global_optargs)
 
     def __str__(self):
         printer = QueryPrinter(self)
@@ -755,16 +764,54 @@ class RqlTzinfo(datetime.tzinfo):
 # respectively.  This may make it a little harder for users to work
 # with converted grouped data, unless they do a simple iteration over
 # the result
+#
+# The keys come straight from the JSON decoder, which only produces exact lists
+# and dicts, so the type is compared directly and scalars are never recursed on.
 def recursively_make_hashable(obj):
-    if isinstance(obj, list):
-        return tuple([recursively_make_hashable(i) for i in obj])
-    elif isinstance(obj, dict):
+    obj_type = type(obj)
+    if obj_type is list:
+        return tuple(
+            [
+                recursively_make_hashable(i) if type(i) in _unhashable_types else i
+                for i in obj
+            ]
+        )
+    elif obj_type is dict:
         return frozenset(
-            [(k, recursively_make_hashable(v)) for k, v in dict_items(obj)]
+            [
+                (k, recursively_make_hashable(v) if type(v) in _unhashable_types else v)
+                for k, v in dict_items(obj)
+            ]
         )
     return obj
 
 
+_unhashable_types = (list, dict)
+
+
+_JSON_SCALAR_TYPES = frozenset((str, unicode, int, bool, type(None)))
+
+
+def _is_plain_json(obj):
+    # Whether orjson writes obj exactly as the json module would. orjson
+    # writes NaN and infinity as null and serializes UUIDs, enums and
+    # dataclasses itself, where ReQLEncoder fails or calls default(). Terms
+    # are not descended into, default() builds them.
+    if type(obj) in _JSON_SCALAR_TYPES:
+        return True
+    if isinstance(obj, float):
+        # NaN and infinity are the only floats whose difference isn't 0
+        return obj - obj == 0.0
+    if isinstance(obj, (list, tuple)):
+        return all(_is_plain_json(value) for value in obj)
+    if isinstance(obj, dict):
+        return all(
+            isinstance(key, (str, unicode, int, type(None))) and _is_plain_json(value)
+            for key, value in obj.items()
+        )
+    return isinstance(obj, (str, unicode, int, type(None), RqlQuery))
+
+
 class ReQLEncoder(json.JSONEncoder):
     """
     Default JSONEncoder subclass to handle query conversion.
@@ -784,16 +831,98 @@ class ReQLEncoder(json.JSONEncoder):
             return obj.build()
         return json.JSONEncoder.default(self, obj)
 
+    def encode(self, o):
+        if not self._encodes_with_orjson():
+            return json.JSONEncoder.encode(self, o)
+        return self.encode_bytes(o).decode("utf-8")
+
+    def encode_bytes(self, o):
+        """
+        Encode the object to UTF-8 encoded JSON. With orjson, its output is
+        returned as is, without decoding it to a string first.
+        """
+
+        if not self._encodes_with_orjson() or not _is_plain_json(o):
+            return json.JSONEncoder.encode(self, o).encode("utf-8")
+
+        try:
+            return orjson.dumps(
+                o,
+                default=self._orjson_default,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+            )
+        except orjson.JSONEncodeError:
+            # the json module raises the same errors as before, or encodes
+            # what orjson refuses, like integers beyond 64 bit
+            return json.JSONEncoder.encode(self, o).encode("utf-8")
+
+    def _encodes_with_orjson(self):
+        # Subclasses passing other options to the json module or overriding
+        # how it encodes would be ignored by orjson
+        cls = type(self)
+        return orjson is not None and (
+            cls is ReQLEncoder
+            or all(
+                getattr(cls, name) is getattr(ReQLEncoder, name)
+                for name in ("__init__", "iterencode", "default")
+            )
+        )
+
+    def _orjson_default(self, obj):
+        value = self.default(obj)
+        if type(value) in _JSON_SCALAR_TYPES:
+            return value
+        # other terms build lists and dicts of terms, plain data only comes
+        # from datums
+        if (isinstance(obj, Datum) or not isinstance(obj, RqlQuery)) and (
+            not _is_plain_json(value)
+        ):
+            # leave the value to the json module, see _is_plain_json
+            raise TypeError("%r is encoded by the json module" % (value,))
+        return value
+
 
 class ReQLDecoder(json.JSONDecoder):
     """
     Default JSONDecoder subclass to handle pseudo-type conversion.
     """
 
+    _pseudotype_converters = None
+
     def __init__(self, reql_format_opts=None):
         json.JSONDecoder.__init__(self, object_hook=self.convert_pseudotype)
         self.reql_format_opts = reql_format_opts or {}
 
+    def decode(self, s, *args):
+        if orjson is None or args or not self._has_stock_object_hook():
+            return json.JSONDecoder.decode(self, decode_utf8(s), *args)
+
+        # orjson has no object_hook and walking its result in Python costs more
+        # than the json scanner calling the hook, so take it only when there is
+        # no pseudo-type to convert
+        if isinstance(s, memoryview):
+            has_pseudotype = _PSEUDOTYPE_MARKER.search(s) is not None
+        else:
+            marker = "$reql_type$" if isinstance(s, str) else b"$reql_type$"
+            has_pseudotype = marker in s
+        if has_pseudotype:
+            return json.JSONDecoder.decode(self, decode_utf8(s))
+
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError:
+            # orjson is stricter (e.g. integers beyond 64 bit), let json decide
+            return json.JSONDecoder.decode(self, decode_utf8(s))
+
+    def _has_stock_object_hook(self):
+        # Subclasses may convert plain objects too, those always need the hook
+        convert_pseudotype = type(self).convert_pseudotype
+        return (
+            getattr(convert_pseudotype, "__func__", convert_pseudotype)
+            is _stock_convert_pseudotype
+            and self.object_hook == self.convert_pseudotype
+        )
+
     def convert_time(self, obj):
         if "epoch_time" not in obj:
             raise ReqlDriverError(
@@ -835,42 +964,62 @@ class ReQLDecoder(json.JSONDecoder):
             )
         return RqlBinary(base64.b64decode(obj["data"].encode("utf-8")))
 
-    def convert_pseudotype(self, obj):
-        reql_type = obj.get("$reql_type$")
-        if reql_type is not None:
-            if reql_type == "TIME":
-                time_format = self.reql_format_opts.get("time_format")
-                if time_format is None or time_format == "native":
-                    # Convert to native python datetime object
-                    return self.convert_time(obj)
-                elif time_format != "raw":
-                    raise ReqlDriverError(
-                        'Unknown time_format run option "%s".' % time_format
-                    )
-            elif reql_type == "GROUPED_DATA":
-                group_format = self.reql_format_opts.get("group_format")
-                if group_format is None or group_format == "native":
-                    return self.convert_grouped_data(obj)
-                elif group_format != "raw":
-                    raise ReqlDriverError(
-                        'Unknown group_format run option "%s".' % group_format
-                    )
-            elif reql_type == "GEOMETRY":
+    def _get_pseudotype_converter(self, format_option, convert):
+        reql_format = self.reql_format_opts.get(format_option)
+        if reql_format is None or reql_format == "native":
+            return convert
+        elif reql_format == "raw":
+            return _return_raw_object
+
+        def unknown_format(obj):
+            raise ReqlDriverError(
+                'Unknown %s run option "%s".' % (format_option, reql_format)
+            )
+
+        return unknown_format
+
+    def _get_pseudotype_converters(self):
+        # The run options can't change while a response is decoded, so the
+        # converter of each pseudo-type is resolved only once per decoder
+        converters = self._pseudotype_converters
+        if converters is None:
+            converters = self._pseudotype_converters = {
+                # Convert to native python datetime object
+                "TIME": self._get_pseudotype_converter(
+                    "time_format", self.convert_time
+                ),
+                "GROUPED_DATA": self._get_pseudotype_converter(
+                    "group_format", self.convert_grouped_data
+                ),
                 # No special support for this. Just return the raw object
-                return obj
-            elif reql_type == "BINARY":
-                binary_format = self.reql_format_opts.get("binary_format")
-                if binary_format is None or binary_format == "native":
-                    return self.convert_binary(obj)
-                elif binary_format != "raw":
-                    raise ReqlDriverError(
-                        'Unknown binary_format run option "%s".' % binary_format
-                    )
-            else:
-                raise ReqlDriverError("Unknown pseudo-type %s" % reql_type)
-        # If there was no pseudotype, or the relevant format is raw, return
-        # the original object
-        return obj
+                "GEOMETRY": _return_raw_object,
+                "BINARY": self._get_pseudotype_converter(
+                    "binary_format", self.convert_binary
+                ),
+            }
+        return converters
+
+    def convert_pseudotype(self, obj):
+        # Nearly every object is a plain one, return those before any lookup
+        if "$reql_type$" not in obj:
+            return obj
+
+        reql_type = obj["$reql_type$"]
+        if reql_type is None:
+            return obj
+
+        converter = self._get_pseudotype_converters().get(reql_type)
+        if converter is None:
+            raise ReqlDriverError("Unknown pseudo-type %s" % reql_type)
+        # If the relevant format is raw, the converter returns the original object
+        return converter(obj)
+
+
+_stock_convert_pseudotype = ReQLDecoder.__dict__["convert_pseudotype"]
+
+
+def _return_raw_object(obj):
+    return obj
 
 
 # This class handles the conversion of RQL terminal types in both directions
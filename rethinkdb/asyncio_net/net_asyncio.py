@@ -18,7 +18,6 @@
 import asyncio
 import contextlib
 import socket
-import ssl
 import struct
 
 from rethinkdb import ql2_pb2
@@ -30,7 +29,14 @@ from rethinkdb.errors import (
     RqlCursorEmpty,
 )
 from rethinkdb.net import Connection as ConnectionBase
-from rethinkdb.net import Cursor, Query, Response, maybe_profile
+from rethinkdb.net import (
+    Cursor,
+    Query,
+    Response,
+    _sequence_response_types,
+    _ssl_context,
+    maybe_profile,
+)
 
 __all__ = ["Connection"]
 
@@ -38,46 +44,195 @@ __all__ = ["Connection"]
 pResponse = ql2_pb2.Response.ResponseType
 pQuery = ql2_pb2.Query.QueryType
 
+# token and length of a response frame
+_HEADER_STRUCT = struct.Struct("<qL")
+# do not hand the transport less room than this, it would mean more reads
+_MIN_READ = 4096
 
-@asyncio.coroutine
-def _read_until(streamreader, delimiter):
-    """Naive implementation of reading until a delimiter"""
-    buffer = bytearray()
 
-    while True:
-        c = yield from streamreader.read(1)
-        if c == b"":
-            break  # EOF
-        buffer.append(c[0])
-        if c == delimiter:
-            break
+# Transports hand data to a BufferedProtocol (Python 3.7+) through its own
+# buffer, older interpreters call `data_received` instead.
+class ResponseProtocol(getattr(asyncio, "BufferedProtocol", asyncio.Protocol)):
+    """
+    Protocol of a ConnectionInstance. Data is received into a buffer owned by
+    the protocol, where the NUL terminated handshake messages and then the
+    response frames are parsed in place and dispatched as soon as they are
+    complete, without a reader task or a StreamReader in between.
+    """
+
+    # asyncio's protocol classes have no __dict__ either
+    __slots__ = (
+        "_instance",
+        "_buf",
+        "_view",
+        "_start",
+        "_filled",
+        "_needed",
+        "_handshake",
+        "_handshake_message",
+        "_failed",
+        "transport",
+        "at_eof",
+    )
+
+    def __init__(self, instance, buffer_size=65536):
+        self._instance = instance
+        self._buf = bytearray(buffer_size)
+        self._view = memoryview(self._buf)
+        self._start = 0
+        self._filled = 0
+        self._needed = 12
+        self._handshake = True
+        self._handshake_message = None
+        self._failed = False
+        self.transport = None
+        self.at_eof = False
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def get_buffer(self, sizehint):
+        start, filled = self._start, self._filled
+        # room for the rest of the current message and a reasonably sized read
+        size = max(start + self._needed, filled + max(sizehint, _MIN_READ))
+        if size > len(self._buf):
+            self._compact(size - start)
+        return self._view[self._filled :]
+
+    def _compact(self, size):
+        # Move the incomplete message to the front, into a larger buffer if it
+        # does not fit. This is the only place the buffer is copied or
+        # replaced, so the transport never holds a view of a stale buffer.
+        start, filled = self._start, self._filled
+        pending = filled - start
+        if size > len(self._buf):
+            buf = bytearray(max(size, 2 * len(self._buf)))
+            buf[:pending] = self._view[start:filled]
+            self._buf = buf
+            self._view = memoryview(buf)
+        elif start >= pending:
+            self._buf[:pending] = self._view[start:filled]
+        else:
+            # overlapping regions
+            self._buf[:pending] = bytes(self._view[start:filled])
+        self._start = 0
+        self._filled = pending
+
+    def buffer_updated(self, nbytes):
+        if self._failed:
+            # the connection is being closed, drop whatever is still read
+            return
+        self._filled += nbytes
+        self._process()
+
+    def data_received(self, data):
+        self.get_buffer(len(data))[: len(data)] = data
+        self.buffer_updated(len(data))
+
+    def read_handshake_message(self):
+        """Return a future of the next handshake message, without its NUL"""
+
+        message = self._handshake_message = self._instance._create_future()
+        # the server may have sent several messages at once
+        self._process()
+        return message
+
+    def handshake_done(self):
+        self._handshake = False
+        self._needed = 12
+
+    def _process(self):
+        buf, view, filled = self._buf, self._view, self._filled
+        offset = self._start
+
+        try:
+            if self._handshake:
+                waiter = self._handshake_message
+                end = buf.find(b"\0", offset, filled)
+                if end < 0:
+                    self._needed = filled - offset + 1
+                elif waiter is not None and not waiter.done():
+                    waiter.set_result(bytes(view[offset:end]))
+                    self._handshake_message = None
+                    offset = end + 1
+            else:
+                needed = 12
+                while filled - offset >= 12:
+                    (token, length,) = _HEADER_STRUCT.unpack_from(buf, offset)
+                    end = offset + 12 + length
+                    if end > filled:
+                        needed = end - offset
+                        break
 
-    return bytes(buffer)
+                    # the payload is decoded straight from the buffer
+                    self._instance._handle_response(token, view[offset + 12 : end])
+                    offset = end
+                self._needed = needed
+        except Exception as ex:
+            # the frames before the failing one were dispatched already, do
+            # not parse them again when more data comes in
+            self._failed = True
+            self._start = self._filled = 0
+            self._needed = 12
+            self._fail(ex)
+            return
+
+        if offset == filled:
+            # everything was consumed, start over without copying
+            self._start = self._filled = 0
+        else:
+            # the incomplete message is moved by get_buffer, once it has to
+            self._start = offset
+
+    def connection_lost(self, exc):
+        self.at_eof = True
+        self._fail(exc or ReqlDriverError("Connection closed by the server."))
+
+    def _fail(self, ex):
+        waiter = self._handshake_message
+        if waiter is not None and not waiter.done():
+            waiter.set_exception(ex)
+        if not self._instance._closing and not self._handshake:
+            asyncio.ensure_future(
+                self._instance.close(exception=ex), loop=self._instance._io_loop
+            )
 
 
-def reusable_waiter(loop, timeout):
-    """Wait for something, with a timeout from when the waiter was created.
+@asyncio.coroutine
+def _wait_for_response(loop, response, deadline):
+    """Wait until the `response` future is done, or the `deadline` passed.
 
-    This can be used in loops::
+    The future is shared by every coroutine waiting on the cursor, so instead
+    of shielding it for `wait_for`, a timeout or a cancellation only ever
+    touches the private waiter::
 
-        waiter = reusable_waiter(event_loop, 10.0)
+        deadline = event_loop.time() + 10.0
         while some_condition:
-            yield from waiter(some_future)
+            yield from _wait_for_response(event_loop, some_future, deadline)
     """
-    if timeout is not None:
-        deadline = loop.time() + timeout
-    else:
-        deadline = None
+    if response.done():
+        return
 
-    @asyncio.coroutine
-    def wait(future):
-        if deadline is not None:
-            new_timeout = max(deadline - loop.time(), 0)
-        else:
-            new_timeout = None
-        return (yield from asyncio.wait_for(future, new_timeout, loop=loop))
+    waiter = loop.create_future()
 
-    return wait
+    def wake(_):
+        if not waiter.done():
+            waiter.set_result(None)
+
+    response.add_done_callback(wake)
+    timeout_handle = None
+    if deadline is not None:
+        timeout_handle = loop.call_at(deadline, wake, None)
+
+    try:
+        yield from waiter
+    finally:
+        response.remove_done_callback(wake)
+        if timeout_handle is not None:
+            timeout_handle.cancel()
+
+    if not response.done():
+        raise ReqlTimeoutError()
 
 
 @contextlib.contextmanager
@@ -96,7 +251,7 @@ def translate_timeout_errors():
 class AsyncioCursor(Cursor):
     def __init__(self, *args, **kwargs):
         Cursor.__init__(self, *args, **kwargs)
-        self.new_response = asyncio.Future()
+        self.new_response = self.conn._create_future()
 
     def __aiter__(self):
         return self
@@ -119,20 +274,19 @@ class AsyncioCursor(Cursor):
     def _extend(self, res_buf):
         Cursor._extend(self, res_buf)
         self.new_response.set_result(True)
-        self.new_response = asyncio.Future()
+        self.new_response = self.conn._create_future()
 
     # Convenience function so users know when they've hit the end of the cursor
     # without having to catch an exception
     @asyncio.coroutine
     def fetch_next(self, wait=True):
-        timeout = Cursor._wait_to_timeout(wait)
-        waiter = reusable_waiter(self.conn._io_loop, timeout)
+        loop = self.conn._io_loop
+        deadline = self._deadline(loop, Cursor._wait_to_timeout(wait))
         while len(self.items) == 0 and self.error is None:
             self._maybe_fetch_batch()
             if self.error is not None:
                 raise self.error
-            with translate_timeout_errors():
-                yield from waiter(asyncio.shield(self.new_response))
+            yield from _wait_for_response(loop, self.new_response, deadline)
         # If there is a (non-empty) error to be received, we return True, so the
         # user will receive it on the next `next` call.
         return len(self.items) != 0 or not isinstance(self.error, RqlCursorEmpty)
@@ -144,73 +298,82 @@ class AsyncioCursor(Cursor):
 
     @asyncio.coroutine
     def _get_next(self, timeout):
-        waiter = reusable_waiter(self.conn._io_loop, timeout)
-        while len(self.items) == 0:
+        items = self.items
+        # Most calls find a buffered item, those don't need a waiter at all
+        if items:
+            return items.popleft()
+
+        loop = self.conn._io_loop
+        deadline = self._deadline(loop, timeout)
+        while not items:
             self._maybe_fetch_batch()
             if self.error is not None:
                 raise self.error
-            with translate_timeout_errors():
-                yield from waiter(asyncio.shield(self.new_response))
-        return self.items.popleft()
+            yield from _wait_for_response(loop, self.new_response, deadline)
+        return items.popleft()
+
+    @staticmethod
+    def _deadline(loop, timeout):
+        if timeout is None:
+            return None
+        return loop.time() + timeout
 
     def _maybe_fetch_batch(self):
         if (
-            self.error is None
+            self.outstanding_requests == 0
+            and self.error is None
             and len(self.items) < self.threshold
-            and self.outstanding_requests == 0
         ):
             self.outstanding_requests += 1
             asyncio.ensure_future(self.conn._parent._continue(self))
 
 
 class ConnectionInstance(object):
-    _streamreader = None
-    _streamwriter = None
-    _reader_task = None
+    _transport = None
+    _protocol = None
 
     def __init__(self, parent, io_loop=None):
         self._parent = parent
         self._closing = False
         self._user_queries = {}
         self._cursor_cache = {}
-        self._ready = asyncio.Future()
         self._io_loop = io_loop
         if self._io_loop is None:
             self._io_loop = asyncio.get_event_loop()
+        # the loop may provide a faster future (uvloop does), bound to it anyway
+        self._create_future = self._io_loop.create_future
+        self._ready = self._create_future()
 
     def client_port(self):
         if self.is_open():
-            return self._streamwriter.get_extra_info("sockname")[1]
+            return self._transport.get_extra_info("sockname")[1]
 
     def client_address(self):
         if self.is_open():
-            return self._streamwriter.get_extra_info("sockname")[0]
+            return self._transport.get_extra_info("sockname")[0]
 
     @asyncio.coroutine
     def connect(self, timeout):
         try:
             ssl_context = None
             if len(self._parent.ssl) > 0:
-                ssl_context = ssl.SSLContext(ssl.PROTOCOL_SSLv23)
-                if hasattr(ssl_context, "options"):
-                    ssl_context.options |= getattr(ssl, "OP_NO_SSLv2", 0)
-                    ssl_context.options |= getattr(ssl, "OP_NO_SSLv3", 0)
-                ssl_context.verify_mode = ssl.CERT_REQUIRED
-                ssl_context.check_hostname = True  # redundant with match_hostname
-                ssl_context.load_verify_locations(self._parent.ssl["ca_certs"])
-
-            self._streamreader, self._streamwriter = yield from asyncio.open_connection(
+                ssl_context = _ssl_context(self._parent.ssl["ca_certs"])
+
+            (
+                self._transport,
+                self._protocol,
+            ) = yield from self._io_loop.create_connection(
+                lambda: ResponseProtocol(self),
                 self._parent.host,
                 self._parent.port,
-                loop=self._io_loop,
                 ssl=ssl_context,
             )
-            self._streamwriter.get_extra_info("socket").setsockopt(
-                socket.IPPROTO_TCP, socket.TCP_NODELAY, 1
-            )
-            self._streamwriter.get_extra_info("socket").setsockopt(
-                socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1
-            )
+            sock = self._transport.get_extra_info("socket")
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            if hasattr(socket, "TCP_QUICKACK"):
+                # Linux only, don't delay the ACKs of the handshake replies
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
         except Exception as err:
             raise ReqlDriverError(
                 "Could not connect to %s:%s. Error: %s"
@@ -227,15 +390,16 @@ class ConnectionInstance(object):
                         break
                     # This may happen in the `V1_0` protocol where we send two requests as
                     # an optimization, then need to read each separately
-                    if request is not "":
-                        self._streamwriter.write(request)
+                    if request != "":
+                        self._transport.write(request)
 
+                    # every step needs the server's answer to the previous one,
+                    # so the requests can't be batched, only the reads are cheap
                     response = yield from asyncio.wait_for(
-                        _read_until(self._streamreader, b"\0"),
+                        self._protocol.read_handshake_message(),
                         timeout,
                         loop=self._io_loop,
                     )
-                    response = response[:-1]
         except ReqlAuthError:
             yield from self.close()
             raise
@@ -252,13 +416,12 @@ class ConnectionInstance(object):
                 % (self._parent.host, self._parent.port, str(err))
             )
 
-        # Start a parallel function to perform reads
-        #  store a reference to it so it doesn't get destroyed
-        self._reader_task = asyncio.ensure_future(self._reader(), loop=self._io_loop)
+        # From now on the protocol forwards the responses to `_handle_response`
+        self._protocol.handshake_done()
         return self._parent
 
     def is_open(self):
-        return not (self._closing or self._streamreader.at_eof())
+        return not (self._closing or self._protocol.at_eof)
 
     @asyncio.coroutine
     def close(self, noreply_wait=False, token=None, exception=None):
@@ -283,65 +446,51 @@ class ConnectionInstance(object):
             noreply = Query(pQuery.NOREPLY_WAIT, token, None, None)
             yield from self.run_query(noreply, False)
 
-        self._streamwriter.close()
-        # We must not wait for the _reader_task if we got an exception, because that
-        # means that we were called from it. Waiting would lead to a deadlock.
-        if self._reader_task and exception is None:
-            yield from self._reader_task
-
+        if self._transport is not None:
+            self._transport.close()
         return None
 
     @asyncio.coroutine
     def run_query(self, query, noreply):
-        self._streamwriter.write(query.serialize(self._parent._get_json_encoder(query)))
+        self._transport.writelines(
+            query.serialize_parts(self._parent._get_json_encoder(query))
+        )
         if noreply:
             return None
 
-        response_future = asyncio.Future()
+        response_future = self._create_future()
         self._user_queries[query.token] = (query, response_future)
         return (yield from response_future)
 
-    # The _reader coroutine runs in parallel, reading responses
-    # off of the socket and forwarding them to the appropriate Future or Cursor.
-    # This is shut down as a consequence of closing the stream, or an error in the
-    # socket/protocol from the server.  Unexpected errors in this coroutine will
-    # close the ConnectionInstance and be passed to any open Futures or Cursors.
-    @asyncio.coroutine
-    def _reader(self):
-        try:
-            while True:
-                buf = yield from self._streamreader.readexactly(12)
-                (token, length,) = struct.unpack("<qL", buf)
-                buf = yield from self._streamreader.readexactly(length)
-
-                cursor = self._cursor_cache.get(token)
-                if cursor is not None:
-                    cursor._extend(buf)
-                elif token in self._user_queries:
-                    # Do not pop the query from the dict until later, so
-                    # we don't lose track of it in case of an exception
-                    query, future = self._user_queries[token]
-                    res = Response(token, buf, self._parent._get_json_decoder(query))
-                    if res.type == pResponse.SUCCESS_ATOM:
-                        future.set_result(maybe_profile(res.data[0], res))
-                    elif res.type in (
-                        pResponse.SUCCESS_SEQUENCE,
-                        pResponse.SUCCESS_PARTIAL,
-                    ):
-                        cursor = AsyncioCursor(self, query, res)
-                        future.set_result(maybe_profile(cursor, res))
-                    elif res.type == pResponse.WAIT_COMPLETE:
-                        future.set_result(None)
-                    elif res.type == pResponse.SERVER_INFO:
-                        future.set_result(res.data[0])
-                    else:
-                        future.set_exception(res.make_error(query))
-                    del self._user_queries[token]
-                elif not self._closing:
-                    raise ReqlDriverError("Unexpected response received.")
-        except Exception as ex:
-            if not self._closing:
-                yield from self.close(exception=ex)
+    # Forward a response to the appropriate Future or Cursor, called by the
+    # protocol for each complete frame. Unexpected errors close the
+    # ConnectionInstance and are passed to any open Futures or Cursors.
+    def _handle_response(self, token, buf):
+        cursor = self._cursor_cache.get(token)
+        if cursor is not None:
+            cursor._extend(buf)
+            return
+
+        # Do not pop the query from the dict until later, so
+        # we don't lose track of it in case of an exception
+        user_query = self._user_queries.get(token)
+        if user_query is not None:
+            query, future = user_query
+            res = Response(token, buf, self._parent._get_json_decoder(query))
+            if res.type == pResponse.SUCCESS_ATOM:
+                future.set_result(maybe_profile(res.data[0], res))
+            elif res.type in _sequence_response_types:
+                cursor = AsyncioCursor(self, query, res)
+                future.set_result(maybe_profile(cursor, res))
+            elif res.type == pResponse.WAIT_COMPLETE:
+                future.set_result(None)
+            elif res.type == pResponse.SERVER_INFO:
+                future.set_result(res.data[0])
+            else:
+                future.set_exception(res.make_error(query))
+            del self._user_queries[token]
+        elif not self._closing:
+            raise ReqlDriverError("Unexpected response received.")
 
 
 class Connection(ConnectionBase):
@@ -364,9 +513,9 @@ class Connection(ConnectionBase):
 
     @asyncio.coroutine
     def _stop(self, cursor):
-        self.check_open()
+        instance = self.check_open()
         q = Query(pQuery.STOP, cursor.query.token, None, None)
-        return (yield from self._instance.run_query(q, True))
+        return (yield from instance.run_query(q, True))
 
     @asyncio.coroutine
     def reconnect(self, noreply_wait=True, timeout=None):
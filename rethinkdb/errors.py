@@ -44,6 +44,7 @@ __all__ = [
     "RqlTimeoutError",
 ]
 
+import re
 import sys
 
 try:
@@ -79,9 +80,12 @@ except AttributeError:
 
 
 class ReqlCursorEmpty(Exception):
+    # Raised at the end of every cursor; the message is shared by the class
+    # rather than stored on each instance
+    message = "Cursor is empty."
+
     def __init__(self):
-        super(ReqlCursorEmpty, self).__init__("Cursor is empty.")
-        self.message = "Cursor is empty."
+        super(ReqlCursorEmpty, self).__init__(self.message)
 
 
 RqlCursorEmpty = ReqlCursorEmpty
@@ -211,6 +215,11 @@ except NameError:
 RqlTimeoutError = ReqlTimeoutError
 
 
+# Every character but the carrots is blanked out on the carrots line
+_NOT_CARROT = re.compile("[^^]")
+_string_types = (str, type(u""))
+
+
 class QueryPrinter(object):
     def __init__(self, root, frames=None):
         self.root = root
@@ -232,7 +241,7 @@ class QueryPrinter(object):
     def compose_carrots(self, term, frames):
         # This term is the cause of the error
         if len(frames) == 0:
-            return ["^" for i in self.compose_term(term)]
+            return ["^" * len(i) for i in self.compose_term(term)]
 
         cur_frame = frames[0]
         args = [
@@ -249,7 +258,10 @@ class QueryPrinter(object):
             else:
                 optargs[k] = self.compose_term(v)
 
-        return [" " if i != "^" else "^" for i in term.compose(args, optargs)]
+        return [
+            _NOT_CARROT.sub(" ", i) if "^" in i else " " * len(i)
+            for i in term.compose(args, optargs)
+        ]
 
 
 # This 'enhanced' tuple recursively iterates over it's elements allowing us to
@@ -263,17 +275,20 @@ class T(object):
         self.intsp = opts.pop("intsp", "")
 
     def __iter__(self):
-        itr = iter(self.seq)
-
-        try:
-            for sub in next(itr):
-                yield sub
-        except StopIteration:
-            return
-
-        for token in itr:
-            for sub in self.intsp:
-                yield sub
-
-            for sub in token:
-                yield sub
+        # Strings are yielded whole rather than character by character
+        intsp = self.intsp
+        if not isinstance(intsp, _string_types):
+            intsp = "".join(intsp)
+
+        first = True
+        for token in self.seq:
+            if first:
+                first = False
+            elif intsp:
+                yield intsp
+
+            if isinstance(token, _string_types):
+                yield token
+            else:
+                for sub in token:
+                    yield sub
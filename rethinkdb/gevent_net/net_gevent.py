@@ -15,7 +15,6 @@
 # This file incorporates work covered by the following copyright:
 # Copyright 2010-2016 RethinkDB, all rights reserved.
 
-import errno
 import ssl
 import struct
 
@@ -32,13 +31,15 @@ from rethinkdb.errors import (
     RqlDriverError,
     RqlTimeoutError,
 )
-from rethinkdb.logger import default_logger
 
 __all__ = ["Connection"]
 
 pResponse = ql2_pb2.Response.ResponseType
 pQuery = ql2_pb2.Query.QueryType
 
+# token and length of a response frame
+_HEADER_STRUCT = struct.Struct("<qL")
+
 
 class GeventCursorEmpty(ReqlCursorEmpty, StopIteration):
     pass
@@ -74,15 +75,15 @@ class GeventCursor(net.Cursor):
             return self.items.popleft()
 
 
-# TODO: would be nice to share this code with net.py
-# TODO(grandquista): code seems to already be a duplicate of superclass
-# revisit this after testing is inplace.
+# Only connecting differs from net.SocketWrapper: the socket is a gevent one,
+# and timeouts are enforced with gevent.Timeout instead of socket timeouts.
 class SocketWrapper(net.SocketWrapper):
     def __init__(self, parent):
         self.host = parent._parent.host
         self.port = parent._parent.port
-        self._read_buffer = None
+        self._init_read_buffer()
         self._socket = None
+        self._timeout = None
         self.ssl = parent._parent.ssl
 
         try:
@@ -95,15 +96,7 @@ class SocketWrapper(net.SocketWrapper):
                     if hasattr(
                         ssl, "SSLContext"
                     ):  # Python2.7 and 3.2+, or backports.ssl
-                        ssl_context = ssl.SSLContext(ssl.PROTOCOL_SSLv23)
-                        if hasattr(ssl_context, "options"):
-                            ssl_context.options |= getattr(ssl, "OP_NO_SSLv2", 0)
-                            ssl_context.options |= getattr(ssl, "OP_NO_SSLv3", 0)
-                        self.ssl_context.verify_mode = ssl.CERT_REQUIRED
-                        self.ssl_context.check_hostname = (
-                            True  # redundant with match_hostname
-                        )
-                        self.ssl_context.load_verify_locations(self.ssl["ca_certs"])
+                        ssl_context = net._ssl_context(self.ssl["ca_certs"])
                         self._socket = ssl_context.wrap_socket(
                             self._socket, server_hostname=self.host
                         )
@@ -134,16 +127,11 @@ class SocketWrapper(net.SocketWrapper):
                     break
                 # This may happen in the `V1_0` protocol where we send two requests as
                 # an optimization, then need to read each separately
-                if request is not "":
+                if request != "":
                     self.sendall(request)
 
                 # The response from the server is a null-terminated string
-                response = b""
-                while True:
-                    char = self.recvall(1)
-                    if char == b"\0":
-                        break
-                    response += char
+                response = self.recvuntil(b"\0", None)
         except (ReqlAuthError, ReqlTimeoutError):
             self.close()
             raise
@@ -161,68 +149,6 @@ class SocketWrapper(net.SocketWrapper):
                 "Could not connect to %s:%s. Error: %s" % (self.host, self.port, ex)
             )
 
-    def close(self):
-        if self._socket is not None:
-            try:
-                self._socket.shutdown(socket.SHUT_RDWR)
-                self._socket.close()
-            except Exception as ex:
-                default_logger.error(ex.message)
-            finally:
-                self._socket = None
-
-    def recvall(self, length):
-        res = b"" if self._read_buffer is None else self._read_buffer
-        while len(res) < length:
-            while True:
-                try:
-                    chunk = self._socket.recv(length - len(res))
-                    break
-                except ReqlTimeoutError:
-                    raise
-                except IOError as ex:
-                    if ex.errno == errno.ECONNRESET:
-                        self.close()
-                        raise ReqlDriverError("Connection is closed.")
-                    elif ex.errno != errno.EINTR:
-                        self.close()
-                        raise ReqlDriverError(
-                            "Connection interrupted receiving from %s:%s - %s"
-                            % (self.host, self.port, str(ex))
-                        )
-                except Exception as ex:
-                    self.close()
-                    raise ReqlDriverError(
-                        "Error receiving from %s:%s - %s"
-                        % (self.host, self.port, str(ex))
-                    )
-            if len(chunk) == 0:
-                self.close()
-                raise ReqlDriverError("Connection is closed.")
-            res += chunk
-        return res
-
-    def sendall(self, data):
-        offset = 0
-        while offset < len(data):
-            try:
-                offset += self._socket.send(data[offset:])
-            except IOError as ex:
-                if ex.errno == errno.ECONNRESET:
-                    self.close()
-                    raise ReqlDriverError("Connection is closed.")
-                elif ex.errno != errno.EINTR:
-                    self.close()
-                    raise ReqlDriverError(
-                        ("Connection interrupted " + "sending to %s:%s - %s")
-                        % (self.host, self.port, str(ex))
-                    )
-            except Exception as ex:
-                self.close()
-                raise ReqlDriverError(
-                    "Error sending to %s:%s - %s" % (self.host, self.port, str(ex))
-                )
-
 
 class ConnectionInstance(object):
     def __init__(self, parent, io_loop=None):
@@ -297,26 +223,28 @@ class ConnectionInstance(object):
     def _reader(self):
         try:
             while True:
-                buf = self._socket.recvall(12)
-                (token, length,) = struct.unpack("<qL", buf)
-                buf = self._socket.recvall(length)
+                buf = self._socket.recvall(12, None)
+                (token, length,) = _HEADER_STRUCT.unpack(buf)
+                # the body is decoded before the next read, so it does not
+                # have to be copied out of the read buffer
+                buf = self._socket.recvall_view(length, None)
 
                 cursor = self._cursor_cache.get(token)
                 if cursor is not None:
                     cursor._extend(buf)
-                elif token in self._user_queries:
-                    # Do not pop the query from the dict until later, so
-                    # we don't lose track of it in case of an exception
-                    query, async_res = self._user_queries[token]
+                    continue
+
+                # Do not pop the query from the dict until later, so
+                # we don't lose track of it in case of an exception
+                user_query = self._user_queries.get(token)
+                if user_query is not None:
+                    query, async_res = user_query
                     res = net.Response(
                         token, buf, self._parent._get_json_decoder(query)
                     )
                     if res.type == pResponse.SUCCESS_ATOM:
                         async_res.set(net.maybe_profile(res.data[0], res))
-                    elif res.type in (
-                        pResponse.SUCCESS_SEQUENCE,
-                        pResponse.SUCCESS_PARTIAL,
-                    ):
+                    elif res.type in net._sequence_response_types:
                         cursor = GeventCursor(self, query, res)
                         async_res.set(net.maybe_profile(cursor, res))
                     elif res.type == pResponse.WAIT_COMPLETE:
@@ -19,17 +19,17 @@ import base64
 import binascii
 import hashlib
 import hmac
+import json
+import os
 import struct
 import sys
 import threading
-from random import SystemRandom
 
 import six
 
 from rethinkdb import ql2_pb2
 from rethinkdb.errors import ReqlAuthError, ReqlDriverError
-from rethinkdb.helpers import chain_to_bytes, decode_utf8
-from rethinkdb.logger import default_logger
+from rethinkdb.helpers import decode_utf8
 
 try:
     xrange
@@ -37,17 +37,46 @@ except NameError:
     xrange = range
 
 
-def compare_digest(digest_a, digest_b):
-    if sys.version_info[0] == 3:
+if sys.version_info[0] == 3:
 
-        def xor_bytes(digest_a, digest_b):
-            return digest_a ^ digest_b
+    def _xor_bytes(digest_a, digest_b):
+        return digest_a ^ digest_b
 
-    else:
+    def _xor_digests(digest_a, digest_b):
+        return (
+            int.from_bytes(digest_a, "big") ^ int.from_bytes(digest_b, "big")
+        ).to_bytes(len(digest_a), "big")
 
-        def xor_bytes(digest_a, digest_b, _ord=ord):
-            return _ord(digest_a) ^ _ord(digest_b)
 
+else:
+
+    def _xor_bytes(digest_a, digest_b, _ord=ord):
+        return _ord(digest_a) ^ _ord(digest_b)
+
+    def _xor_digests(digest_a, digest_b):
+        return binascii.unhexlify(
+            "%0*x"
+            % (
+                len(digest_a) * 2,
+                int(binascii.hexlify(digest_a), 16)
+                ^ int(binascii.hexlify(digest_b), 16),
+            )
+        )
+
+
+if hasattr(hmac, "digest"):
+
+    def _hmac_sha256(key, message):
+        return hmac.digest(key, message, "sha256")
+
+
+else:
+
+    def _hmac_sha256(key, message):
+        return hmac.new(key, message, hashlib.sha256).digest()
+
+
+def compare_digest(digest_a, digest_b, xor_bytes=_xor_bytes):
     left = None
     right = digest_b
     if len(digest_a) == len(digest_b):
@@ -80,13 +109,6 @@ def pbkdf2_hmac(hash_name, password, salt, iterations):
         except TypeError:
             return unhexlify(bytes("%064x" % value))
 
-    cache_key = (password, salt, iterations)
-
-    cache_result = HandshakeV1_0.PBKDF2_CACHE.get(cache_key)
-
-    if cache_result is not None:
-        return cache_result
-
     mac = hmac.new(password, None, hashlib.sha256)
 
     def digest(msg, mac=mac):
@@ -100,9 +122,25 @@ def pbkdf2_hmac(hash_name, password, salt, iterations):
         t = digest(t)
         u ^= from_bytes(t)
 
-    u = to_bytes(u)
-    HandshakeV1_0.PBKDF2_CACHE.set(cache_key, u)
-    return u
+    return to_bytes(u)
+
+
+# SCRAM message fragments, kept as bytes so that messages can be built by
+# plain concatenation
+_USERNAME_PREFIX = b"n="
+_NONCE_PREFIX = b",r="
+_GS2_HEADER = b"n,,"
+_FINAL_MESSAGE_PREFIX = b"c=biws,r="
+_PROOF_PREFIX = b",p="
+_SERVER_KEY = b"Server Key"
+_CLIENT_KEY = b"Client Key"
+
+# Only the authentication field of the first message changes between
+# connections, so the message is formatted instead of JSON-encoded whole
+_INITIAL_MESSAGE_FORMAT = (
+    '{"protocol_version": %d, "authentication_method": "SCRAM-SHA-256", '
+    '"authentication": %s}'
+)
 
 
 class LocalThreadCache(threading.local):
@@ -134,6 +172,7 @@ class HandshakeV1_0(object):
     VERSION = ql2_pb2.VersionDummy.Version.V1_0
     PROTOCOL = ql2_pb2.VersionDummy.Protocol.JSON
     PBKDF2_CACHE = LocalThreadCache()
+    VERSION_HEADER = struct.pack("<L", VERSION)
 
     def __init__(self, json_decoder, json_encoder, host, port, username, password):
         """
@@ -190,9 +229,10 @@ class HandshakeV1_0(object):
         """
 
         first_client_message = response["authentication"].encode("ascii")
-        authentication = dict(
-            x.split(b"=", 1) for x in first_client_message.split(b",")
-        )
+        authentication = {}
+        for attribute in first_client_message.split(b","):
+            key, _, value = attribute.partition(b"=")
+            authentication[key] = value
         return first_client_message, authentication
 
     def _next_state(self):
@@ -238,27 +278,18 @@ class HandshakeV1_0(object):
         if response is not None:
             raise ReqlDriverError("Unexpected response")
 
-        self._random_nonce = base64.standard_b64encode(
-            bytes(bytearray(SystemRandom().getrandbits(8) for i in range(18)))
-        )
+        self._random_nonce = base64.standard_b64encode(os.urandom(18))
 
-        self._first_client_message = chain_to_bytes(
-            "n=", self._username, ",r=", self._random_nonce
+        self._first_client_message = (
+            _USERNAME_PREFIX + self._username + _NONCE_PREFIX + self._random_nonce
         )
 
-        initial_message = chain_to_bytes(
-            struct.pack("<L", self.VERSION),
-            self._json_encoder.encode(
-                {
-                    "protocol_version": self._protocol_version,
-                    "authentication_method": "SCRAM-SHA-256",
-                    "authentication": chain_to_bytes(
-                        "n,,", self._first_client_message
-                    ).decode("ascii"),
-                }
-            ).encode("utf-8"),
-            b"\0",
-        )
+        authentication = (_GS2_HEADER + self._first_client_message).decode("ascii")
+        json_message = (
+            _INITIAL_MESSAGE_FORMAT
+            % (self._protocol_version, json.dumps(authentication))
+        ).encode("utf-8")
+        initial_message = self.VERSION_HEADER + json_message + b"\0"
 
         self._next_state()
         return initial_message
@@ -290,6 +321,34 @@ class HandshakeV1_0(object):
         self._next_state()
         return ""
 
+    def _get_scram_keys(self, salt, iterations):
+        """
+        Get the SCRAM client, stored and server keys for the password. Salting the
+        password takes `iterations` rounds of HMAC-SHA256, so the keys are cached per
+        thread and reconnecting to the same server does not pay for it again.
+
+        :param salt: Salt sent by the database
+        :param iterations: Iteration count sent by the database
+        :return: Tuple of the client key, the stored key and the server key
+        """
+
+        cache_key = (self._password, salt, iterations)
+        keys = self.PBKDF2_CACHE.get(cache_key)
+
+        if keys is None:
+            salted_password = self._pbkdf2_hmac(
+                "sha256", self._password, salt, iterations
+            )
+            client_key = _hmac_sha256(salted_password, _CLIENT_KEY)
+            keys = (
+                client_key,
+                hashlib.sha256(client_key).digest(),
+                _hmac_sha256(salted_password, _SERVER_KEY),
+            )
+            self.PBKDF2_CACHE.set(cache_key, keys)
+
+        return keys
+
     def _prepare_auth_request(self, response):
         """
         Put tohether the authentication request based on the response of the database.
@@ -309,51 +368,30 @@ class HandshakeV1_0(object):
         if not random_nonce.startswith(self._random_nonce):
             raise ReqlAuthError("Invalid nonce from server", self._host, self._port)
 
-        salted_password = self._pbkdf2_hmac(
-            "sha256",
-            self._password,
-            base64.standard_b64decode(authentication[b"s"]),
-            int(authentication[b"i"]),
+        client_key, stored_key, server_key = self._get_scram_keys(
+            base64.standard_b64decode(authentication[b"s"]), int(authentication[b"i"])
         )
 
-        message_without_proof = chain_to_bytes("c=biws,r=", random_nonce)
+        message_without_proof = _FINAL_MESSAGE_PREFIX + random_nonce
         auth_message = b",".join(
             (self._first_client_message, first_client_message, message_without_proof)
         )
 
-        self._server_signature = hmac.new(
-            hmac.new(salted_password, b"Server Key", hashlib.sha256).digest(),
-            auth_message,
-            hashlib.sha256,
-        ).digest()
-
-        client_key = hmac.new(salted_password, b"Client Key", hashlib.sha256).digest()
-        client_signature = hmac.new(
-            hashlib.sha256(client_key).digest(), auth_message, hashlib.sha256
-        ).digest()
-        client_proof = struct.pack(
-            "32B",
-            *(
-                l ^ random_nonce
-                for l, random_nonce in zip(
-                    struct.unpack("32B", client_key),
-                    struct.unpack("32B", client_signature),
-                )
-            )
-        )
-
-        authentication_request = chain_to_bytes(
-            self._json_encoder.encode(
-                {
-                    "authentication": chain_to_bytes(
-                        message_without_proof,
-                        ",p=",
-                        base64.standard_b64encode(client_proof),
-                    ).decode("ascii")
-                }
-            ),
-            b"\0",
-        )
+        self._server_signature = _hmac_sha256(server_key, auth_message)
+
+        client_signature = _hmac_sha256(stored_key, auth_message)
+        client_proof = _xor_digests(client_key, client_signature)
+
+        json_message = self._json_encoder.encode(
+            {
+                "authentication": (
+                    message_without_proof
+                    + _PROOF_PREFIX
+                    + base64.standard_b64encode(client_proof)
+                ).decode("ascii")
+            }
+        ).encode("utf-8")
+        authentication_request = json_message + b"\0"
 
         self._next_state()
         return authentication_request
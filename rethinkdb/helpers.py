@@ -2,6 +2,12 @@ import six
 
 
 def decode_utf8(string, encoding="utf-8"):
+    if isinstance(string, memoryview):
+        # memoryview has no decode method, on Python 3 str() reads it in place
+        if six.PY3:
+            return str(string, encoding)
+        string = string.tobytes()
+
     if hasattr(string, "decode"):
         return string.decode(encoding)
 
@@ -18,8 +18,9 @@
 
 import collections
 import errno
+import functools
+import itertools
 import numbers
-import pprint
 import socket
 import ssl
 import struct
@@ -45,6 +46,7 @@ from rethinkdb.errors import (
     ReqlUserError,
 )
 from rethinkdb.handshake import HandshakeV1_0
+from rethinkdb.helpers import decode_utf8
 from rethinkdb.logger import default_logger
 
 try:
@@ -55,10 +57,12 @@ except ImportError:
 
 __all__ = [
     "Connection",
+    "ConnectionConfig",
     "Cursor",
     "DEFAULT_PORT",
     "DefaultConnection",
     "make_connection",
+    "make_connection_config",
 ]
 
 
@@ -93,34 +97,128 @@ def maybe_profile(value, res):
     return value
 
 
+# Token and body length prefixed to every query
+_QUERY_HEADER_STRUCT = struct.Struct("<QL")
+# Token and body length prefixed to every response
+_RESPONSE_HEADER_STRUCT = struct.Struct("<qL")
+# Minimum size of the reads, so that small messages take a single one
+_RECV_SIZE = 4096
+
+
+# The default encoder and decoders keep no state between documents, so every
+# query shares them instead of instantiating its own
+_default_json_encoder = ReQLEncoder()
+_default_json_decoders = {}
+_format_run_options = ("time_format", "group_format", "binary_format")
+
+
+def _get_default_json_decoder(global_optargs):
+    # ReQLDecoder only reads the format run options
+    global_optargs = global_optargs or {}
+    key = tuple([global_optargs.get(option) for option in _format_run_options])
+    try:
+        decoder = _default_json_decoders.get(key)
+    except TypeError:
+        return ReQLDecoder(global_optargs)  # unhashable option value
+
+    if decoder is None:
+        reql_format_opts = dict(
+            (option, value)
+            for option, value in zip(_format_run_options, key)
+            if value is not None
+        )
+        decoder = _default_json_decoders[key] = ReQLDecoder(reql_format_opts)
+    return decoder
+
+
 class Query(object):
+    __slots__ = (
+        "type",
+        "token",
+        "term",
+        "global_optargs",
+        "_json_encoder",
+        "_json_decoder",
+    )
+
     def __init__(self, type, token, term, global_optargs):
         self.type = type
         self.token = token
         self.term = term
         self.global_optargs = global_optargs
 
-        global_optargs = global_optargs or {}
-        self._json_encoder = global_optargs.pop("json_encoder", None)
-        self._json_decoder = global_optargs.pop("json_decoder", None)
+        if global_optargs:
+            self._json_encoder = global_optargs.pop("json_encoder", None)
+            self._json_decoder = global_optargs.pop("json_decoder", None)
+        else:
+            self._json_encoder = self._json_decoder = None
+
+    def serialize_parts(self, reql_encoder=None):
+        """
+        Serialize the query into its header and its JSON body, for transports
+        which can write them without concatenating them first.
+        """
+        if reql_encoder is None:
+            reql_encoder = _default_json_encoder
 
-    def serialize(self, reql_encoder=ReQLEncoder()):
         message = [self.type]
         if self.term is not None:
             message.append(self.term)
         if self.global_optargs is not None:
             message.append(expr(self.global_optargs))
-        query_str = reql_encoder.encode(message).encode("utf-8")
-        query_header = struct.pack("<QL", self.token, len(query_str))
+        # only ReQLEncoder's own encode goes with its encode_bytes, which may
+        # skip the str with orjson
+        encoder_class = type(reql_encoder)
+        if (
+            getattr(encoder_class, "encode", None) is ReQLEncoder.encode
+            and getattr(encoder_class, "encode_bytes", None) is ReQLEncoder.encode_bytes
+        ):
+            query_str = reql_encoder.encode_bytes(message)
+        else:
+            query_str = reql_encoder.encode(message).encode("utf-8")
+        query_header = _QUERY_HEADER_STRUCT.pack(self.token, len(query_str))
+        return query_header, query_str
+
+    def serialize(self, reql_encoder=None):
+        query_header, query_str = self.serialize_parts(reql_encoder)
         return query_header + query_str
 
 
+# Response types which start a cursor
+_sequence_response_types = frozenset(
+    (pResponse.SUCCESS_PARTIAL, pResponse.SUCCESS_SEQUENCE)
+)
+
+# Error classes of the response types which do not carry an error type
+_response_error_classes = {
+    pResponse.CLIENT_ERROR: ReqlDriverError,
+    pResponse.COMPILE_ERROR: ReqlServerCompileError,
+}
+
+# Error classes of the runtime errors by error type
+_runtime_error_classes = {
+    pErrorType.INTERNAL: ReqlInternalError,
+    pErrorType.RESOURCE_LIMIT: ReqlResourceLimitError,
+    pErrorType.QUERY_LOGIC: ReqlQueryLogicError,
+    pErrorType.NON_EXISTENCE: ReqlNonExistenceError,
+    pErrorType.OP_FAILED: ReqlOpFailedError,
+    pErrorType.OP_INDETERMINATE: ReqlOpIndeterminateError,
+    pErrorType.USER: ReqlUserError,
+    pErrorType.PERMISSION_ERROR: ReqlPermissionError,
+}
+
+
 class Response(object):
-    def __init__(self, token, json_str, reql_decoder=ReQLDecoder()):
-        try:
-            json_str = json_str.decode("utf-8")
-        except AttributeError:
-            pass  # Python3 str objects are already utf-8
+    __slots__ = ("token", "type", "data", "backtrace", "profile", "error_type")
+
+    def __init__(self, token, json_str, reql_decoder=None):
+        if reql_decoder is None:
+            reql_decoder = _get_default_json_decoder(None)
+        # ReQLDecoder.decode reads any bytes-like buffer, which spares orjson
+        # the decoding to str; other decoders, including subclasses overriding
+        # decode, get the usual unicode string
+        if getattr(type(reql_decoder), "decode", None) is not ReQLDecoder.decode:
+            json_str = decode_utf8(json_str)
         self.token = token
         full_response = reql_decoder.decode(json_str)
         self.type = full_response["t"]
@@ -130,28 +228,22 @@ class Response(object):
         self.error_type = full_response.get("e", None)
 
     def make_error(self, query):
-        if self.type == pResponse.CLIENT_ERROR:
-            return ReqlDriverError(self.data[0], query.term, self.backtrace)
-        elif self.type == pResponse.COMPILE_ERROR:
-            return ReqlServerCompileError(self.data[0], query.term, self.backtrace)
+        error_class = _response_error_classes.get(self.type)
+        if error_class is not None:
+            return error_class(self.data[0], query.term, self.backtrace)
         elif self.type == pResponse.RUNTIME_ERROR:
-            return {
-                pErrorType.INTERNAL: ReqlInternalError,
-                pErrorType.RESOURCE_LIMIT: ReqlResourceLimitError,
-                pErrorType.QUERY_LOGIC: ReqlQueryLogicError,
-                pErrorType.NON_EXISTENCE: ReqlNonExistenceError,
-                pErrorType.OP_FAILED: ReqlOpFailedError,
-                pErrorType.OP_INDETERMINATE: ReqlOpIndeterminateError,
-                pErrorType.USER: ReqlUserError,
-                pErrorType.PERMISSION_ERROR: ReqlPermissionError,
-            }.get(self.error_type, ReqlRuntimeError)(
-                self.data[0], query.term, self.backtrace
-            )
+            error_class = _runtime_error_classes.get(self.error_type, ReqlRuntimeError)
+            return error_class(self.data[0], query.term, self.backtrace)
         return ReqlDriverError(
             ("Unknown Response type %d encountered" + " in a response.") % self.type
         )
 
 
+# Ends a cursor which failed; it goes through _extend like any response so that
+# the cursor implementations wake up their waiters
+_empty_sequence_response = '{"t":%d,"r":[]}' % pResponse.SUCCESS_SEQUENCE
+
+
 # This class encapsulates all shared behavior between cursor implementations.
 # It provides iteration over the cursor using `iter`, as well as incremental
 # iteration using `next`.
@@ -189,6 +281,8 @@ class Cursor(object):
     ):
         self.conn = conn_instance
         self.query = query
+        # The default deque pops items in C. A list with a moving head index
+        # needs several bytecodes per item and drains batches ~4x slower.
         self.items = items_type()
         self.outstanding_requests = 0
         self.threshold = 1
@@ -246,14 +340,14 @@ class Cursor(object):
         if self.outstanding_requests == 0 and self.error is not None:
             del self.conn._cursor_cache[res.token]
 
+    def _format_items(self):
+        items = self.items
+        val_str = ", ".join(repr(item) for item in itertools.islice(items, 10))
+        if len(items) > 10:
+            val_str += ", ..."
+        return "[%s]" % val_str
+
     def __str__(self):
-        val_str = pprint.pformat(
-            [self.items[x] for x in range(min(10, len(self.items)))]
-            + (["..."] if len(self.items) > 10 else [])
-        )
-        if val_str.endswith("'...']"):
-            val_str = val_str[: -len("'...']")] + "...]"
-        spacer_str = "\n" if "\n" in val_str else ""
         if self.error is None:
             status_str = "streaming"
         elif isinstance(self.error, ReqlCursorEmpty):
@@ -261,22 +355,14 @@ class Cursor(object):
         else:
             status_str = "error: %s" % str(self.error)
 
-        return "%s.%s (%s): %s%s" % (
+        return "%s.%s (%s): %s" % (
             self.__class__.__module__,
             self.__class__.__name__,
             status_str,
-            spacer_str,
-            val_str,
+            self._format_items(),
         )
 
     def __repr__(self):
-        val_str = pprint.pformat(
-            [self.items[x] for x in range(min(10, len(self.items)))]
-            + (["..."] if len(self.items) > 10 else [])
-        )
-        if val_str.endswith("'...']"):
-            val_str = val_str[: -len("'...']")] + "...]"
-        spacer_str = "\n" if "\n" in val_str else ""
         if self.error is None:
             status_str = "streaming"
         elif isinstance(self.error, ReqlCursorEmpty):
@@ -284,27 +370,25 @@ class Cursor(object):
         else:
             status_str = "error: %s" % repr(self.error)
 
-        return "<%s.%s object at %s (%s): %s%s>" % (
+        return "<%s.%s object at %s (%s): %s>" % (
             self.__class__.__module__,
             self.__class__.__name__,
             hex(id(self)),
             status_str,
-            spacer_str,
-            val_str,
+            self._format_items(),
         )
 
     def _error(self, message):
         # Set an error and extend with a dummy response to trigger any waiters
         if self.error is None:
             self.error = ReqlRuntimeError(message, self.query.term, [])
-            dummy_response = '{"t":%d,"r":[]}' % pResponse.SUCCESS_SEQUENCE
-            self._extend(dummy_response)
+            self._extend(_empty_sequence_response)
 
     def _maybe_fetch_batch(self):
         if (
-            self.error is None
+            self.outstanding_requests == 0
+            and self.error is None
             and len(self.items) < self.threshold
-            and self.outstanding_requests == 0
         ):
             self.outstanding_requests += 1
             self.conn._parent._continue(self)
@@ -319,27 +403,57 @@ class DefaultCursor(Cursor):
     def __iter__(self):
         return self
 
-    def __next__(self):
-        return self._get_next(None)
-
     def _empty_error(self):
         return DefaultCursorEmpty()
 
-    def _get_next(self, timeout):
+    def _get_next(self, timeout=None):
+        items = self.items
+        if items:
+            return items.popleft()
+
         deadline = None if timeout is None else time.time() + timeout
-        while len(self.items) == 0:
+        while len(items) == 0:
             self._maybe_fetch_batch()
             if self.error is not None:
                 raise self.error
             self.conn._read_response(self.query, deadline)
-        return self.items.popleft()
+        return items.popleft()
+
+    # Iterating calls _get_next directly, without going through a wrapper
+    __next__ = _get_next
+
+
+# SSL contexts by CA certificates path, so the certificates are read once
+_ssl_contexts = {}
+
+
+def _ssl_context(ca_certs):
+    """
+    Return an SSL context verifying the server against `ca_certs`. Contexts
+    are shared between connections, loading the certificates is not cheap.
+    """
+    ssl_context = _ssl_contexts.get(ca_certs)
+    if ssl_context is None:
+        if hasattr(ssl, "PROTOCOL_TLS_CLIENT"):  # Python 3.6+
+            # requires a certificate and checks the hostname by default
+            ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        else:
+            ssl_context = ssl.SSLContext(ssl.PROTOCOL_SSLv23)
+            if hasattr(ssl_context, "options"):
+                ssl_context.options |= getattr(ssl, "OP_NO_SSLv2", 0)
+                ssl_context.options |= getattr(ssl, "OP_NO_SSLv3", 0)
+            ssl_context.verify_mode = ssl.CERT_REQUIRED
+            ssl_context.check_hostname = True  # redundant with match_hostname
+        ssl_context.load_verify_locations(ca_certs)
+        ssl_context = _ssl_contexts.setdefault(ca_certs, ssl_context)
+    return ssl_context
 
 
 class SocketWrapper(object):
     def __init__(self, parent, timeout):
         self.host = parent._parent.host
         self.port = parent._parent.port
-        self._read_buffer = None
+        self._init_read_buffer()
         self._socket = None
         self.ssl = parent._parent.ssl
 
@@ -347,6 +461,8 @@ class SocketWrapper(object):
 
         try:
             self._socket = socket.create_connection((self.host, self.port), timeout)
+            # the timeout of the socket, so that it is only changed when needed
+            self._timeout = timeout
             self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
             self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
 
@@ -355,15 +471,7 @@ class SocketWrapper(object):
                     if hasattr(
                         ssl, "SSLContext"
                     ):  # Python2.7 and 3.2+, or backports.ssl
-                        ssl_context = ssl.SSLContext(ssl.PROTOCOL_SSLv23)
-                        if hasattr(ssl_context, "options"):
-                            ssl_context.options |= getattr(ssl, "OP_NO_SSLv2", 0)
-                            ssl_context.options |= getattr(ssl, "OP_NO_SSLv3", 0)
-                        ssl_context.verify_mode = ssl.CERT_REQUIRED
-                        ssl_context.check_hostname = (
-                            True  # redundant with match_hostname
-                        )
-                        ssl_context.load_verify_locations(self.ssl["ca_certs"])
+                        ssl_context = _ssl_context(self.ssl["ca_certs"])
                         self._socket = ssl_context.wrap_socket(
                             self._socket, server_hostname=self.host
                         )
@@ -412,12 +520,7 @@ class SocketWrapper(object):
                     self.sendall(request)
 
                 # The response from the server is a null-terminated string
-                response = b""
-                while True:
-                    char = self.recvall(1, deadline)
-                    if char == b"\0":
-                        break
-                    response += char
+                response = self.recvuntil(b"\0", deadline)
         except (ReqlAuthError, ReqlTimeoutError):
             self.close()
             raise
@@ -454,50 +557,145 @@ class SocketWrapper(object):
             finally:
                 self._socket = None
 
+    def _init_read_buffer(self):
+        # received data which was not read yet is _read_buffer[start:end]
+        self._read_buffer = bytearray(_RECV_SIZE)
+        self._read_view = memoryview(self._read_buffer)
+        self._read_start = self._read_end = 0
+
     def recvall(self, length, deadline):
-        res = b"" if self._read_buffer is None else self._read_buffer
+        return bytes(self.recvall_view(length, deadline))
+
+    def recvall_view(self, length, deadline):
+        """
+        Receive `length` bytes, as a view of the read buffer. The view is
+        only valid until the next read, the data has to be used or copied
+        before that.
+        """
+
+        if self._read_end - self._read_start < length:
+            # reading ahead gets the body of a small response together with
+            # its header, and the next response if it is there
+            self._reserve(max(length, _RECV_SIZE))
+            self._settimeout(deadline)
+            try:
+                while self._read_end - self._read_start < length:
+                    self._recv()
+            finally:
+                if self._socket is not None:
+                    self._settimeout(None)
+
+        return self._consume(length, length)
+
+    def recvuntil(self, delimiter, deadline):
+        """
+        Receive the data up to `delimiter`, which is consumed but not returned.
+        Data received after the delimiter is kept for the next reads.
+        """
+
+        buf = self._read_buffer
+        end = buf.find(delimiter, self._read_start, self._read_end)
+        if end < 0:
+            self._settimeout(deadline)
+            try:
+                while end < 0:
+                    self._reserve(self._read_end - self._read_start + _RECV_SIZE)
+                    # only the new data has to be searched
+                    start = max(self._read_start, self._read_end - len(delimiter) + 1)
+                    self._recv()
+                    end = self._read_buffer.find(delimiter, start, self._read_end)
+            finally:
+                if self._socket is not None:
+                    self._settimeout(None)
+
+        length = end - self._read_start
+        return bytes(self._consume(length, length + len(delimiter)))
+
+    def _settimeout(self, deadline):
+        # Queries without a deadline leave the socket blocking, without any
+        # settimeout call
         timeout = None if deadline is None else max(0, deadline - time.time())
-        self._socket.settimeout(timeout)
-        while len(res) < length:
-            while True:
-                try:
-                    chunk = self._socket.recv(length - len(res))
-                    self._socket.settimeout(None)
-                    break
-                except socket.timeout:
-                    self._read_buffer = res
-                    self._socket.settimeout(None)
-                    raise ReqlTimeoutError(self.host, self.port)
-                except IOError as ex:
-                    if ex.errno == errno.ECONNRESET:
-                        self.close()
-                        raise ReqlDriverError("Connection is closed.")
-                    elif ex.errno == errno.EWOULDBLOCK:
-                        # This should only happen with a timeout of 0
-                        raise ReqlTimeoutError(self.host, self.port)
-                    elif ex.errno != errno.EINTR:
-                        raise ReqlDriverError(
-                            ("Connection interrupted " + "receiving from %s:%s - %s")
-                            % (self.host, self.port, str(ex))
-                        )
-                except Exception as ex:
+        if timeout != self._timeout:
+            self._socket.settimeout(timeout)
+            self._timeout = timeout
+
+    def _consume(self, length, consumed):
+        # Return a view of `length` bytes from the read position, and advance
+        # it by `consumed` bytes
+        start = self._read_start
+        res = self._read_view[start : start + length]
+        if start + consumed == self._read_end:
+            # everything was read, start over without moving any data
+            self._read_start = self._read_end = 0
+        else:
+            self._read_start = start + consumed
+        return res
+
+    def _reserve(self, size):
+        # Make room for `size` bytes from the read position, by moving the
+        # unread data to the front, into a larger buffer if it does not fit
+        start, end = self._read_start, self._read_end
+        if start + size <= len(self._read_buffer):
+            return
+
+        pending = end - start
+        if size > len(self._read_buffer):
+            buf = bytearray(max(size, 2 * len(self._read_buffer)))
+            buf[:pending] = self._read_view[start:end]
+            self._read_buffer = buf
+            self._read_view = memoryview(buf)
+        elif start >= pending:
+            self._read_buffer[:pending] = self._read_view[start:end]
+        else:
+            # overlapping regions
+            self._read_buffer[:pending] = bytes(self._read_view[start:end])
+        self._read_start = 0
+        self._read_end = pending
+
+    def _recv(self):
+        # Receive into the free end of the read buffer, straight from the
+        # socket. On timeout, the data received so far stays in the buffer.
+        while True:
+            try:
+                received = self._socket.recv_into(self._read_view[self._read_end :])
+                break
+            except socket.timeout:
+                raise ReqlTimeoutError(self.host, self.port)
+            except ReqlTimeoutError:
+                # raised from within recv_into by the gevent connection's
+                # gevent.Timeout
+                raise
+            except IOError as ex:
+                if ex.errno == errno.ECONNRESET:
                     self.close()
+                    raise ReqlDriverError("Connection is closed.")
+                elif ex.errno == errno.EWOULDBLOCK:
+                    # This should only happen with a timeout of 0
+                    raise ReqlTimeoutError(self.host, self.port)
+                elif ex.errno != errno.EINTR:
                     raise ReqlDriverError(
-                        "Error receiving from %s:%s - %s"
+                        ("Connection interrupted " + "receiving from %s:%s - %s")
                         % (self.host, self.port, str(ex))
                     )
-
-            if len(chunk) == 0:
+            except Exception as ex:
                 self.close()
-                raise ReqlDriverError("Connection is closed.")
-            res += chunk
-        return res
+                raise ReqlDriverError(
+                    "Error receiving from %s:%s - %s" % (self.host, self.port, str(ex))
+                )
+
+        if received == 0:
+            self.close()
+            raise ReqlDriverError("Connection is closed.")
+        self._read_end += received
 
     def sendall(self, data):
-        offset = 0
-        while offset < len(data):
+        while True:
             try:
-                offset += self._socket.send(data[offset:])
+                sent = self._socket.send(data)
+                if sent == len(data):
+                    return
+                # the rest is sent without copying it
+                data = memoryview(data)[sent:]
             except IOError as ex:
                 if ex.errno == errno.ECONNRESET:
                     self.close()
@@ -567,7 +765,7 @@ class ConnectionInstance(object):
 
         if res.type == pResponse.SUCCESS_ATOM:
             return maybe_profile(res.data[0], res)
-        elif res.type in (pResponse.SUCCESS_PARTIAL, pResponse.SUCCESS_SEQUENCE):
+        elif res.type in _sequence_response_types:
             cursor = DefaultCursor(self, query, res)
             return maybe_profile(cursor, res)
         elif res.type == pResponse.WAIT_COMPLETE:
@@ -588,8 +786,12 @@ class ConnectionInstance(object):
                 # expected length of this response.
                 if self._header_in_progress is None:
                     self._header_in_progress = self._socket.recvall(12, deadline)
-                (res_token, res_len,) = struct.unpack("<qL", self._header_in_progress)
-                res_buf = self._socket.recvall(res_len, deadline)
+                (res_token, res_len,) = _RESPONSE_HEADER_STRUCT.unpack(
+                    self._header_in_progress
+                )
+                # the body is decoded before the next read, so it does not
+                # have to be copied out of the read buffer
+                res_buf = self._socket.recvall_view(res_len, deadline)
                 self._header_in_progress = None
             except KeyboardInterrupt as ex:
                 # Cancel outstanding queries by dropping this connection,
@@ -615,10 +817,18 @@ class ConnectionInstance(object):
                 raise ReqlDriverError("Unexpected response received.")
 
 
+def _new_token_counter():
+    # Returns a callable handing out tokens 0, 1, 2, ... Each call is one
+    # next() on itertools.count in C, so tokens never repeat between threads
+    return functools.partial(next, itertools.count())
+
+
 class Connection(object):
     _r = None
     _json_decoder = ReQLDecoder
     _json_encoder = ReQLEncoder
+    # the sentinel never equals a database name, None included
+    _db_term = (object(), None)
 
     def __init__(
         self,
@@ -649,7 +859,7 @@ class Connection(object):
         self._conn_type = conn_type
         self._child_kwargs = kwargs
         self._instance = None
-        self._next_token = 0
+        self._new_token = _new_token_counter()
 
         if "json_encoder" in kwargs:
             self._json_encoder = kwargs.pop("json_encoder")
@@ -669,9 +879,21 @@ class Connection(object):
         if _handshake_version == 4:
             raise NotImplementedError("The v0.4 handshake was removed.")
 
+        # The handshake only needs plain JSON, so the default coders are shared
+        if self._json_decoder is ReQLDecoder:
+            handshake_decoder = _get_default_json_decoder(None)
+        else:
+            handshake_decoder = self._json_decoder()
+        # Encoders keep no state between documents either, so the connection
+        # instantiates its encoder class once for the handshake and the queries
+        if self._json_encoder is ReQLEncoder:
+            self._json_encoder_instance = _default_json_encoder
+        else:
+            self._json_encoder_instance = self._json_encoder()
+
         self.handshake = HandshakeV1_0(
-            self._json_decoder(),
-            self._json_encoder(),
+            handshake_decoder,
+            self._json_encoder_instance,
             self.host,
             self.port,
             user,
@@ -715,54 +937,68 @@ class Connection(object):
         return self._instance is not None and self._instance.is_open()
 
     def check_open(self):
-        if self._instance is None or not self._instance.is_open():
+        instance = self._instance
+        if instance is None or not instance.is_open():
             raise ReqlDriverError("Connection is closed.")
+        return instance
 
     def close(self, noreply_wait=True):
         if self._instance is not None:
             instance = self._instance
             noreply_wait_token = self._new_token()
             self._instance = None
-            self._next_token = 0
+            self._new_token = _new_token_counter()
             return instance.close(noreply_wait, noreply_wait_token)
 
     def noreply_wait(self):
-        self.check_open()
+        instance = self.check_open()
         q = Query(pQuery.NOREPLY_WAIT, self._new_token(), None, None)
-        return self._instance.run_query(q, False)
+        return instance.run_query(q, False)
 
     def server(self):
-        self.check_open()
+        instance = self.check_open()
         q = Query(pQuery.SERVER_INFO, self._new_token(), None, None)
-        return self._instance.run_query(q, False)
+        return instance.run_query(q, False)
 
-    def _new_token(self):
-        res = self._next_token
-        self._next_token += 1
-        return res
-
-    def _start(self, term, **global_optargs):
-        self.check_open()
+    def _start(self, term, global_optargs):
+        instance = self.check_open()
         if "db" in global_optargs or self.db is not None:
-            global_optargs["db"] = DB(global_optargs.get("db", self.db))
+            global_optargs["db"] = self._get_db_term(global_optargs.get("db", self.db))
         q = Query(pQuery.START, self._new_token(), term, global_optargs)
-        return self._instance.run_query(q, global_optargs.get("noreply", False))
+        return instance.run_query(q, global_optargs.get("noreply", False))
+
+    def _get_db_term(self, db):
+        # Terms are not modified by serialization, so the `r.db` term of the
+        # last used database is kept and shared by the following queries
+        db_name, db_term = self._db_term
+        if db_name != db:
+            db_term = DB(db)
+            self._db_term = (db, db_term)
+        return db_term
 
     def _continue(self, cursor):
-        self.check_open()
+        instance = self.check_open()
         q = Query(pQuery.CONTINUE, cursor.query.token, None, None)
-        return self._instance.run_query(q, True)
+        return instance.run_query(q, True)
 
     def _stop(self, cursor):
-        self.check_open()
+        instance = self.check_open()
         q = Query(pQuery.STOP, cursor.query.token, None, None)
-        return self._instance.run_query(q, True)
+        return instance.run_query(q, True)
 
     def _get_json_decoder(self, query):
-        return (query._json_decoder or self._json_decoder)(query.global_optargs)
+        decoder_class = query._json_decoder or self._json_decoder
+        if decoder_class is ReQLDecoder:
+            return _get_default_json_decoder(query.global_optargs)
+        return decoder_class(query.global_optargs)
 
     def _get_json_encoder(self, query):
-        return (query._json_encoder or self._json_encoder)()
+        encoder_class = query._json_encoder
+        if encoder_class is None:
+            return self._json_encoder_instance
+        if encoder_class is ReQLEncoder:
+            return _default_json_encoder
+        return encoder_class()
 
 
 class DefaultConnection(Connection):
@@ -770,8 +1006,23 @@ class DefaultConnection(Connection):
         Connection.__init__(self, ConnectionInstance, *args, **kwargs)
 
 
-def make_connection(
-    connection_type,
+ConnectionConfig = collections.namedtuple(
+    "ConnectionConfig",
+    [
+        "host",
+        "port",
+        "db",
+        "auth_key",
+        "user",
+        "password",
+        "timeout",
+        "ssl",
+        "handshake_version",
+    ],
+)
+
+
+def make_connection_config(
     host=None,
     port=None,
     db=None,
@@ -782,8 +1033,13 @@ def make_connection(
     ssl=None,
     url=None,
     _handshake_version=10,
-    **kwargs
 ):
+    """
+    Resolve the connection URL and the defaults of the connection parameters once.
+    The resulting config can be passed to `make_connection` any number of times,
+    for example by every worker of a pool, to skip this step.
+    """
+
     if url:
         connection_string = urlparse(url)
         query_string = parse_qs(connection_string.query)
@@ -815,16 +1071,39 @@ def make_connection(
     if not password and not password is None:
         password = None
 
-    conn = connection_type(
-        host,
-        port,
-        db,
-        auth_key,
-        user,
-        password,
-        timeout,
-        ssl,
-        _handshake_version,
-        **kwargs
+    return ConnectionConfig(
+        host, port, db, auth_key, user, password, timeout, ssl, _handshake_version
     )
-    return conn.reconnect(timeout=timeout)
+
+
+def make_connection(
+    connection_type,
+    host=None,
+    port=None,
+    db=None,
+    auth_key=None,
+    user=None,
+    password=None,
+    timeout=20,
+    ssl=None,
+    url=None,
+    _handshake_version=10,
+    config=None,
+    **kwargs
+):
+    if config is None:
+        config = make_connection_config(
+            host,
+            port,
+            db,
+            auth_key,
+            user,
+            password,
+            timeout,
+            ssl,
+            url,
+            _handshake_version,
+        )
+
+    conn = connection_type(*config, **kwargs)
+    return conn.reconnect(timeout=config.timeout)
@@ -31,13 +31,22 @@ from rethinkdb.errors import (
     ReqlTimeoutError,
 )
 from rethinkdb.net import Connection as ConnectionBase
-from rethinkdb.net import Cursor, Query, Response, maybe_profile
+from rethinkdb.net import (
+    Cursor,
+    Query,
+    Response,
+    _sequence_response_types,
+    maybe_profile,
+)
 
 __all__ = ["Connection"]
 
 pResponse = ql2_pb2.Response.ResponseType
 pQuery = ql2_pb2.Query.QueryType
 
+# token and length of a response frame
+_HEADER_STRUCT = struct.Struct("<qL")
+
 
 @gen.coroutine
 def with_absolute_timeout(deadline, generator, **kwargs):
@@ -246,23 +255,23 @@ class ConnectionInstance(object):
         try:
             while True:
                 buf = yield self._stream.read_bytes(12)
-                (token, length,) = struct.unpack("<qL", buf)
+                (token, length,) = _HEADER_STRUCT.unpack(buf)
                 buf = yield self._stream.read_bytes(length)
 
                 cursor = self._cursor_cache.get(token)
                 if cursor is not None:
                     cursor._extend(buf)
-                elif token in self._user_queries:
-                    # Do not pop the query from the dict until later, so
-                    # we don't lose track of it in case of an exception
-                    query, future = self._user_queries[token]
+                    continue
+
+                # Do not pop the query from the dict until later, so
+                # we don't lose track of it in case of an exception
+                user_query = self._user_queries.get(token)
+                if user_query is not None:
+                    query, future = user_query
                     res = Response(token, buf, self._parent._get_json_decoder(query))
                     if res.type == pResponse.SUCCESS_ATOM:
                         future.set_result(maybe_profile(res.data[0], res))
-                    elif res.type in (
-                        pResponse.SUCCESS_SEQUENCE,
-                        pResponse.SUCCESS_PARTIAL,
-                    ):
+                    elif res.type in _sequence_response_types:
                         cursor = TornadoCursor(self, query, res)
                         future.set_result(maybe_profile(cursor, res))
                     elif res.type == pResponse.WAIT_COMPLETE:
@@ -312,8 +321,8 @@ class Connection(ConnectionBase):
         raise gen.Return(res)
 
     @gen.coroutine
-    def _start(self, term, **global_optargs):
-        res = yield ConnectionBase._start(self, term, **global_optargs)
+    def _start(self, term, global_optargs):
+        res = yield ConnectionBase._start(self, term, global_optargs)
         raise gen.Return(res)
 
     @gen.coroutine
@@ -18,7 +18,6 @@
 import collections
 import contextlib
 import socket
-import ssl
 import struct
 
 import trio
@@ -33,7 +32,15 @@ from rethinkdb.errors import (
     RqlCursorEmpty,
 )
 from rethinkdb.net import Connection as ConnectionBase
-from rethinkdb.net import Cursor, Query, Response, make_connection, maybe_profile
+from rethinkdb.net import (
+    Cursor,
+    Query,
+    Response,
+    _sequence_response_types,
+    _ssl_context,
+    make_connection,
+    maybe_profile,
+)
 
 __all__ = ["Connection"]
 
@@ -41,6 +48,9 @@ __all__ = ["Connection"]
 P_RESPONSE = ql2_pb2.Response.ResponseType
 P_QUERY = ql2_pb2.Query.QueryType
 
+# token and length of a response frame
+_HEADER_STRUCT = struct.Struct("<qL")
+
 
 class TrioFuture:
     """ Trio does not have a future class because Trio encourages the use of
@@ -185,9 +195,9 @@ class TrioCursor(Cursor, trio.abc.AsyncResource):
 
     def _maybe_fetch_batch(self):
         if (
-            self.error is None
+            self.outstanding_requests == 0
+            and self.error is None
             and len(self.items) < self.threshold
-            and self.outstanding_requests == 0
         ):
             self.outstanding_requests += 1
             self._nursery.start_soon(self.conn._parent._continue, self)
@@ -249,13 +259,7 @@ class ConnectionInstance:
         try:
             ssl_context = None
             if len(self._parent.ssl) > 0:
-                ssl_context = ssl.SSLContext(ssl.PROTOCOL_SSLv23)
-                if hasattr(ssl_context, "options"):
-                    ssl_context.options |= getattr(ssl, "OP_NO_SSLv2", 0)
-                    ssl_context.options |= getattr(ssl, "OP_NO_SSLv3", 0)
-                ssl_context.verify_mode = ssl.CERT_REQUIRED
-                ssl_context.check_hostname = True  # redundant with match_hostname
-                ssl_context.load_verify_locations(self._parent.ssl["ca_certs"])
+                ssl_context = _ssl_context(self._parent.ssl["ca_certs"])
             if ssl_context:
                 self._stream = await trio.open_ssl_over_tcp_stream(
                     self._parent.host, self._parent.port, ssl_context=ssl_context
@@ -363,23 +367,23 @@ class ConnectionInstance:
         try:
             while True:
                 buf = await self._read_exactly(12)
-                (token, length,) = struct.unpack("<qL", buf)
+                (token, length,) = _HEADER_STRUCT.unpack(buf)
                 buf = await self._read_exactly(length)
 
                 cursor = self._cursor_cache.get(token)
                 if cursor is not None:
                     cursor._extend(buf)
-                elif token in self._user_queries:
-                    # Do not pop the query from the dict until later, so
-                    # we don't lose track of it in case of an exception
-                    query, future = self._user_queries[token]
+                    continue
+
+                # Do not pop the query from the dict until later, so
+                # we don't lose track of it in case of an exception
+                user_query = self._user_queries.get(token)
+                if user_query is not None:
+                    query, future = user_query
                     res = Response(token, buf, self._parent._get_json_decoder(query))
                     if res.type == P_RESPONSE.SUCCESS_ATOM:
                         future.set_result(maybe_profile(res.data[0], res))
-                    elif res.type in (
-                        P_RESPONSE.SUCCESS_SEQUENCE,
-                        P_RESPONSE.SUCCESS_PARTIAL,
-                    ):
+                    elif res.type in _sequence_response_types:
                         cursor = TrioCursor(self, query, res, nursery=self._nursery)
                         future.set_result(maybe_profile(cursor, res))
                     elif res.type == P_RESPONSE.WAIT_COMPLETE:
@@ -409,9 +413,9 @@ class Connection(ConnectionBase):
             )
 
     async def _stop(self, cursor):
-        self.check_open()
+        instance = self.check_open()
         query = Query(P_QUERY.STOP, cursor.query.token, None, None)
-        return await self._instance.run_query(query, True)
+        return await instance.run_query(query, True)
 
     async def reconnect(self, noreply_wait=True, timeout=None):
         await self.close(noreply_wait)
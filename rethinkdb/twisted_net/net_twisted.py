@@ -26,7 +26,13 @@ from rethinkdb.errors import (
     RqlCursorEmpty,
 )
 from rethinkdb.net import Connection as ConnectionBase
-from rethinkdb.net import Cursor, Query, Response, maybe_profile
+from rethinkdb.net import (
+    Cursor,
+    Query,
+    Response,
+    _sequence_response_types,
+    maybe_profile,
+)
 from twisted.internet import defer, reactor
 from twisted.internet.defer import (
     CancelledError,
@@ -44,6 +50,9 @@ __all__ = ["Connection"]
 pResponse = ql2_pb2.Response.ResponseType
 pQuery = ql2_pb2.Query.QueryType
 
+# token and length of a response frame
+_HEADER_STRUCT = struct.Struct("<qL")
+
 
 class DatabaseProtocol(Protocol):
     WAITING_FOR_HANDSHAKE = 0
@@ -57,15 +66,19 @@ class DatabaseProtocol(Protocol):
             DatabaseProtocol.READY: self._handleResponse,
         }
 
-        self.buf = bytes()
-        self.buf_expected_length = 0
-        self.buf_token = None
+        # received data which was not handled yet
+        self.buf = bytearray()
 
         self.wait_for_handshake = Deferred()
 
         self._open = True
 
     def connectionMade(self):
+        # Like the other transports, do not let Nagle's algorithm hold back
+        # the small handshake and query messages
+        self.transport.setTcpNoDelay(True)
+        self.transport.setTcpKeepAlive(True)
+
         # Send immediately the handshake.
         self.factory.handshake.reset()
         self.transport.write(self.factory.handshake.next_message(None))
@@ -94,8 +107,8 @@ class DatabaseProtocol(Protocol):
             while True:
                 end_index = self.buf.find(b"\0")
                 if end_index != -1:
-                    response = self.buf[:end_index]
-                    self.buf = self.buf[end_index + 1 :]
+                    response = bytes(self.buf[:end_index])
+                    del self.buf[: end_index + 1]
                     request = self.factory.handshake.next_message(response)
 
                     if request is None:
@@ -114,31 +127,24 @@ class DatabaseProtocol(Protocol):
 
     def _handleResponse(self, data):
         # If we have more than one response, we should handle all of them.
-        self.buf += data
-        while True:
-            # 1. Read the header, until we read the length of the awaited payload.
-            if self.buf_expected_length == 0:
-                if len(self.buf) >= 12:
-                    token, length = struct.unpack("<qL", self.buf[:12])
-                    self.buf_token = token
-                    self.buf_expected_length = length
-                    self.buf = self.buf[12:]
-                else:
-                    # We quit the function, it is impossible to have read the
-                    # entire payload at this point.
-                    return
+        buf = self.buf
+        buf += data
+        offset = 0
+        while len(buf) - offset >= 12:
+            # 1. Read the header, the token and the length of the payload.
+            token, length = _HEADER_STRUCT.unpack_from(buf, offset)
 
-            # 2. Buffer the data, until the size of the data match the expected
-            # length provided by the header.
-            if len(self.buf) < self.buf_expected_length:
-                return
+            # 2. Wait until the whole payload is buffered.
+            end = offset + 12 + length
+            if end > len(buf):
+                break
 
-            self.factory.response_handler(
-                self.buf_token, self.buf[: self.buf_expected_length]
-            )
-            self.buf = self.buf[self.buf_expected_length :]
-            self.buf_token = None
-            self.buf_expected_length = 0
+            self.factory.response_handler(token, buf[offset + 12 : end])
+            offset = end
+
+        # The buffer is only shortened once, the incomplete response (if any)
+        # is kept for the next call.
+        del buf[:offset]
 
     def dataReceived(self, data):
         try:
@@ -290,15 +296,17 @@ class ConnectionInstance(object):
             cursor = self._cursor_cache.get(token)
             if cursor is not None:
                 cursor._extend(data)
-            elif token in self._user_queries:
-                query, deferred = self._user_queries[token]
+                return
+
+            # Do not pop the query from the dict until later, so
+            # we don't lose track of it in case of an exception
+            user_query = self._user_queries.get(token)
+            if user_query is not None:
+                query, deferred = user_query
                 res = Response(token, data, self._parent._get_json_decoder(query))
                 if res.type == pResponse.SUCCESS_ATOM:
                     deferred.callback(maybe_profile(res.data[0], res))
-                elif res.type in (
-                    pResponse.SUCCESS_SEQUENCE,
-                    pResponse.SUCCESS_PARTIAL,
-                ):
+                elif res.type in _sequence_response_types:
                     cursor = TwistedCursor(self, query, res)
                     deferred.callback(maybe_profile(cursor, res))
                 elif res.type == pResponse.WAIT_COMPLETE:
@@ -403,8 +411,8 @@ class ConnectionInstance(object):
         if not noreply:
             self._user_queries[query.token] = (query, response_defer)
         # Send the query
-        self._connection.transport.write(
-            query.serialize(self._parent._get_json_encoder(query))
+        self._connection.transport.writeSequence(
+            query.serialize_parts(self._parent._get_json_encoder(query))
         )
 
         if noreply:
@@ -440,8 +448,8 @@ class Connection(ConnectionBase):
         returnValue(res)
 
     @inlineCallbacks
-    def _start(self, term, **global_optargs):
-        res = yield super(Connection, self)._start(term, **global_optargs)
+    def _start(self, term, global_optargs):
+        res = yield super(Connection, self)._start(term, global_optargs)
         returnValue(res)
 
     @inlineCallbacks
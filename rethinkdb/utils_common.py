@@ -18,71 +18,155 @@
 from __future__ import print_function
 
 import collections
-import copy
-import distutils.version
 import getpass
-import inspect
 import optparse
 import os
+import random
 import re
 import sys
 import threading
+import time
 
 from rethinkdb import ast, errors, net, query, version
 
+try:
+    import contextvars
+except ImportError:  # Python < 3.7
+    contextvars = None
+
 default_batch_size = 200
 
+_getpid = os.getpid
+
+
+class _LocalConnectionSlot(threading.local):
+    """Thread-local stand-in for a ContextVar on Python < 3.7"""
+
+    value = None
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+
+def _new_connection_slot():
+    # A context variable also keeps asyncio tasks from sharing one socket
+    if contextvars is not None:
+        return contextvars.ContextVar("rethinkdb_retry_query_conn", default=None)
+    return _LocalConnectionSlot()
+
+
+# connections shared by every RetryQuery of the current thread (or task), keyed
+# by their connect options so that a worker only runs the handshake once
+_connectionPool = _new_connection_slot()
+
+
+def _pool_key(connect_options):
+    # every option is part of the key, the credentials, ssl options and timeout
+    # included, so a connection is only shared by callers opening it alike
+    return tuple(
+        (name, tuple(sorted(value.items())) if isinstance(value, dict) else value)
+        for name, value in sorted(connect_options.items())
+    )
+
+
+def _pool_set(key, value):
+    # copy on write, so contexts inheriting the pool never share an entry
+    pool = dict(_connectionPool.get() or {})
+    if value is None:
+        pool.pop(key, None)
+    else:
+        pool[key] = value
+    _connectionPool.set(pool)
+
+
+def close_pool():
+    """Close the connections pooled for the current thread"""
+
+    pool = _connectionPool.get()
+    _connectionPool.set(None)
+
+    for pid, conn in (pool or {}).values():
+        if pid != _getpid():
+            continue  # owned by the parent process
+        try:
+            conn.close(noreply_wait=False)
+        except errors.ReqlError:
+            pass
+
 
 class RetryQuery(object):
 
     __connectOptions = None
-    __local = None
+    __poolKey = None
+    __fork_check = True
 
-    def __init__(self, connect_options):
+    def __init__(self, connect_options, fork_check=True):
         if "host" not in connect_options:
             raise AssertionError("Hostname is a required connection parameter")
 
         if "port" not in connect_options:
             raise AssertionError("Port number is a required connection parameter")
 
-        connect_options["port"] = int(connect_options["port"])
+        port = int(connect_options["port"])
 
-        if connect_options["port"] <= 0:
+        if port <= 0:
             raise AssertionError("Port number can not be less than one")
 
-        self.__connectOptions = copy.deepcopy(connect_options)
+        connect_options["port"] = port
 
-        self.__local = threading.local()
+        # all values are scalars except the optional ssl dict
+        self.__connectOptions = dict(connect_options)
+        if connect_options.get("ssl"):
+            self.__connectOptions["ssl"] = dict(connect_options["ssl"])
+
+        # worker processes are forked from the parent, so a cached connection
+        # might belong to another process unless we compare the pid
+        self.__fork_check = fork_check
+        self.__poolKey = _pool_key(self.__connectOptions)
 
     def conn(self, test_connection=True):
-        if not hasattr(self.__local, "connCache"):
-            self.__local.connCache = {}
+        pool_key = self.__poolKey
+        cached = (_connectionPool.get() or {}).get(pool_key)
+        conn = None
 
-        # check if existing connection is still good
-        if os.getpid() in self.__local.connCache and test_connection:
-            try:
-                ast.expr(0).run(self.__local.connCache[os.getpid()])
-            except errors.ReqlError:
-                del self.__local.connCache[os.getpid()]
+        if cached is not None:
+            pid, conn = cached
+
+            # drop a connection inherited from the parent process
+            if self.__fork_check and pid != _getpid():
+                conn = None
+
+        # check if existing connection is still good, without a round-trip;
+        # a connection that died silently fails its next query instead
+        if conn is not None and test_connection and not conn.is_open():
+            _pool_set(pool_key, None)
+            conn = None
 
         # cache a new connection
-        if not os.getpid() in self.__local.connCache:
-            self.__local.connCache[os.getpid()] = net.make_connection(
-                net.DefaultConnection, **self.__connectOptions
-            )
+        if conn is None:
+            conn = net.make_connection(net.DefaultConnection, **self.__connectOptions)
+            _pool_set(pool_key, (_getpid(), conn))
 
         # return the connection
-        return self.__local.connCache[os.getpid()]
+        return conn
 
     def __call__(
-        self, name, query_str, times=5, run_options=None, test_connection=True
+        self,
+        name,
+        query_str,
+        times=5,
+        run_options=None,
+        test_connection=True,
+        base_delay=0.1,
+        max_delay=5.0,
     ):
         # Try a query multiple times to guard against bad connections
         if name is None:
             raise AssertionError("Name can not be none")
 
-        name = str(name)
-
         if not isinstance(query_str, ast.RqlQuery):
             raise AssertionError(
                 "Query must be a ReQL query instead of {value}".format(value=query_str)
@@ -105,61 +189,106 @@ class RetryQuery(object):
 
         last_error = None
         test_connection = False
+        retry_errors = (errors.ReqlTimeoutError, errors.ReqlDriverError)
+        connect_errors = errors.ReqlError
+
+        for attempt in range(times):
+            # back off exponentially with full jitter so that clients do
+            # not hammer an overloaded server in lockstep
+            if attempt > 0:
+                time.sleep(
+                    random.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1)))
+                )
 
-        for _ in range(times):
             try:
                 conn = self.conn(
                     test_connection=test_connection
                 )  # we are already guarding for this
-            except errors.ReqlError as e:
-                last_error = RuntimeError(
-                    "Error connecting for during '%s': %s" % (name, str(e))
-                )
+            except connect_errors as e:
+                last_error = ("Error connecting for during '%s': %s", e)
                 test_connection = True
+                continue
+
             try:
-                return query_str.run(conn, **run_options)
-            except (errors.ReqlTimeoutError, errors.ReqlDriverError) as e:
-                last_error = RuntimeError(
-                    "Connection error during '%s': %s" % (name, str(e))
-                )
+                return self._run_once(conn, query_str, run_options)
+            except retry_errors as e:
+                last_error = ("Connection error during '%s': %s", e)
+                self._discard(conn)
             # other errors immediately bubble up
 
         if last_error is not None:
-            raise last_error
-
+            message, error = last_error
+            raise RuntimeError(message % (name, str(error)))
+
+    def _discard(self, conn):
+        # reconnect on the next attempt instead of reusing a failed connection
+        cached = (_connectionPool.get() or {}).get(self.__poolKey)
+        if cached is not None and cached[1] is conn:
+            _pool_set(self.__poolKey, None)
+        try:
+            conn.close(noreply_wait=False)
+        except errors.ReqlError:
+            pass
+
+    def _run_once(self, conn, query_str, run_options):
+        # Run an already validated query without any retry logic
+        return query_str.run(conn, **run_options)
+
+
+_progress_width = 40
+_progress_bars = [
+    ("=" * done, " " * (_progress_width - done)) for done in range(_progress_width + 1)
+]
+_last_flush_time = [0.0]
+_last_done_width = [-1]
+
+
+def print_progress(ratio, indent=0, read=None, write=None, force=False):
+    done_width = max(0, min(int(ratio * _progress_width), _progress_width))
+
+    # redrawing the bar costs a write and a flush on every call, so skip
+    # updates that do not move the bar unless some time has passed
+    now = time.time()
+    if (
+        not force
+        and done_width == _last_done_width[0]
+        and now - _last_flush_time[0] < 0.1
+    ):
+        return
+    _last_done_width[0] = done_width
+    _last_flush_time[0] = now
 
-def print_progress(ratio, indent=0, read=None, write=None):
-    total_width = 40
-    done_width = min(int(ratio * total_width), total_width)
+    done, undone = _progress_bars[done_width]
     sys.stdout.write(
-        "\r%(indent)s[%(done)s%(undone)s] %(percent)3d%%%(readRate)s%(writeRate)s\x1b[K"
-        % {
-            "indent": " " * indent,
-            "done": "=" * done_width,
-            "undone": " " * (total_width - done_width),
-            "percent": int(100 * ratio),
-            "readRate": (" r: %d" % read) if read is not None else "",
-            "writeRate": (" w: %d" % write) if write is not None else "",
-        }
+        "\r%s[%s%s] %3d%%%s%s\x1b[K"
+        % (
+            " " * indent,
+            done,
+            undone,
+            int(100 * ratio),
+            (" r: %d" % read) if read is not None else "",
+            (" w: %d" % write) if write is not None else "",
+        )
     )
     sys.stdout.flush()
 
 
+_versionRegex = re.compile(r"(rethinkdb|rebirthdb) (?P<version>(\d+)\.(\d+)\.(\d+)).*")
+
+
 def check_minimum_version(options, minimum_version="1.6", raise_exception=True):
-    minimum_version = distutils.version.LooseVersion(minimum_version)
+    minimum_version_info = tuple(int(part) for part in minimum_version.split("."))
     version_string = options.retryQuery(
         "get server version",
         query.db("rethinkdb").table("server_status")[0]["process"]["version"],
     )
 
-    matches = re.match(
-        r"(rethinkdb|rebirthdb) (?P<version>(\d+)\.(\d+)\.(\d+)).*", version_string
-    )
+    matches = _versionRegex.match(version_string)
 
     if not matches:
         raise RuntimeError("invalid version string format: %s" % version_string)
 
-    if distutils.version.LooseVersion(matches.group("version")) < minimum_version:
+    if tuple(int(matches.group(i)) for i in (3, 4, 5)) < minimum_version_info:
         if raise_exception:
             raise RuntimeError(
                 "Incompatible version, expected >= %s got: %s"
@@ -171,157 +300,164 @@ def check_minimum_version(options, minimum_version="1.6", raise_exception=True):
 
 DbTable = collections.namedtuple("DbTable", ["db", "table"])
 _tableNameRegex = re.compile(r"^(?P<db>[\w-]+)(\.(?P<table>[\w-]+))?$")
+_connectRegex = re.compile(r"^\s*(?P<hostname>[\w.-]+)(:(?P<port>\d+))?\s*$")
 
+# -- Type Checkers
 
-class CommonOptionsParser(optparse.OptionParser, object):
 
-    __retryQuery = None
-    __connectRegex = re.compile(r"^\s*(?P<hostname>[\w.-]+)(:(?P<port>\d+))?\s*$")
+def check_tls_option(_, opt_str, value):
+    value = str(value)
+    real_value = os.path.realpath(value)
 
-    def format_epilog(self, formatter):
-        return self.epilog or ""
+    if os.path.isfile(real_value):
+        return {"ca_certs": real_value}
+    else:
+        raise optparse.OptionValueError(
+            "Option %s value is not a file: %r" % (opt_str, value)
+        )
 
-    def __init__(self, *args, **kwargs):
-        # -- Type Checkers
 
-        def check_tls_option(_, opt_str, value):
-            value = str(value)
+def check_db_table_option(_, _opt_str, value):
+    res = _tableNameRegex.match(value)
 
-            if os.path.isfile(value):
-                return {"ca_certs": os.path.realpath(value)}
-            else:
-                raise optparse.OptionValueError(
-                    "Option %s value is not a file: %r" % (opt_str, value)
-                )
+    if not res:
+        raise optparse.OptionValueError("Invalid db or db.table name: %s" % value)
+    if res.group("db") == "rethinkdb":
+        raise optparse.OptionValueError(
+            "The `rethinkdb` database is special and cannot be used here"
+        )
 
-        def check_db_table_option(_, _opt_str, value):
-            res = _tableNameRegex.match(value)
+    return DbTable(res.group("db"), res.group("table"))
 
-            if not res:
-                raise optparse.OptionValueError(
-                    "Invalid db or db.table name: %s" % value
-                )
-            if res.group("db") == "rethinkdb":
-                raise optparse.OptionValueError(
-                    "The `rethinkdb` database is special and cannot be used here"
-                )
 
-            return DbTable(res.group("db"), res.group("table"))
+def check_positive_int(_, opt_str, value):
+    try:
+        value = int(value)
+        if value < 1:
+            raise ValueError
+    except ValueError:
+        raise optparse.OptionValueError(
+            "%s value must be an integer greater than 1: %s" % (opt_str, value)
+        )
 
-        def check_positive_int(_, opt_str, value):
-            try:
-                value = int(value)
-                if value < 1:
-                    raise ValueError
-            except ValueError:
-                raise optparse.OptionValueError(
-                    "%s value must be an integer greater than 1: %s" % (opt_str, value)
-                )
+    return value
 
-            return value
 
-        def check_existing_file(_, opt_str, value):
-            if not os.path.isfile(value):
-                raise optparse.OptionValueError(
-                    "%s value was not an existing file: %s" % (opt_str, value)
-                )
+def check_existing_file(_, opt_str, value):
+    real_value = os.path.realpath(value)
 
-            return os.path.realpath(value)
+    if not os.path.isfile(real_value):
+        raise optparse.OptionValueError(
+            "%s value was not an existing file: %s" % (opt_str, value)
+        )
 
-        def check_new_file_location(_, opt_str, value):
-            try:
-                real_value = os.path.realpath(value)
-            except Exception:
-                raise optparse.OptionValueError(
-                    "Incorrect value for %s: %s" % (opt_str, value)
-                )
+    return real_value
 
-            if os.path.exists(real_value):
-                raise optparse.OptionValueError(
-                    "%s value already exists: %s" % (opt_str, value)
-                )
 
-            return real_value
+def check_new_file_location(_, opt_str, value):
+    try:
+        real_value = os.path.realpath(value)
+    except Exception:
+        raise optparse.OptionValueError("Incorrect value for %s: %s" % (opt_str, value))
 
-        def file_contents(_, opt_str, value):
-            if not os.path.isfile(value):
-                raise optparse.OptionValueError(
-                    "%s value is not an existing file: %r" % (opt_str, value)
-                )
+    if os.path.exists(real_value):
+        raise optparse.OptionValueError(
+            "%s value already exists: %s" % (opt_str, value)
+        )
 
-            try:
-                with open(value, "r") as passwordFile:
-                    return passwordFile.read().rstrip("\n")
-            except IOError:
-                raise optparse.OptionValueError(
-                    "bad value for %s: %s" % (opt_str, value)
-                )
+    return real_value
 
-        # -- Callbacks
 
-        def combined_connect_action(obj, opt, value, parser, *args, **kwargs):
-            """optparse.takeaction() calls the callback (which this is set as)
-               with the following args: self, opt, value, parser *args, **kwargs
-            """
-            res = self.__connectRegex.match(value)
-            if not res:
-                raise optparse.OptionValueError(
-                    "Invalid 'host:port' format: %s" % value
-                )
-            if res.group("hostname"):
-                parser.values.hostname = res.group("hostname")
-            if res.group("port"):
-                parser.values.driver_port = int(res.group("port"))
-
-        # -- setup custom Options object
-
-        class CommonOptionChecker(optparse.Option, object):
-            TYPES = optparse.Option.TYPES + (
-                "tls_cert",
-                "db_table",
-                "pos_int",
-                "file",
-                "new_file",
-                "file_contents",
+def file_contents(_, opt_str, value):
+    if not os.path.isfile(value):
+        raise optparse.OptionValueError(
+            "%s value is not an existing file: %r" % (opt_str, value)
+        )
+
+    try:
+        with open(value, "r") as passwordFile:
+            return passwordFile.read().rstrip("\n")
+    except IOError:
+        raise optparse.OptionValueError("bad value for %s: %s" % (opt_str, value))
+
+
+# -- Callbacks
+
+
+def combined_connect_action(obj, opt, value, parser, *args, **kwargs):
+    """optparse.takeaction() calls the callback (which this is set as)
+       with the following args: self, opt, value, parser *args, **kwargs
+    """
+    res = _connectRegex.match(value)
+    if not res:
+        raise optparse.OptionValueError("Invalid 'host:port' format: %s" % value)
+    if res.group("hostname"):
+        parser.values.hostname = res.group("hostname")
+    if res.group("port"):
+        parser.values.driver_port = int(res.group("port"))
+
+
+# -- Custom Options object
+
+
+class CommonOptionChecker(optparse.Option, object):
+    TYPES = optparse.Option.TYPES + (
+        "tls_cert",
+        "db_table",
+        "pos_int",
+        "file",
+        "new_file",
+        "file_contents",
+    )
+
+    TYPE_CHECKER = dict(
+        optparse.Option.TYPE_CHECKER,
+        tls_cert=check_tls_option,
+        db_table=check_db_table_option,
+        pos_int=check_positive_int,
+        file=check_existing_file,
+        new_file=check_new_file_location,
+        file_contents=file_contents,
+    )
+
+    ACTIONS = optparse.Option.ACTIONS + ("add_key", "get_password")
+    STORE_ACTIONS = optparse.Option.STORE_ACTIONS + ("add_key", "get_password")
+    TYPED_ACTIONS = optparse.Option.TYPED_ACTIONS + ("add_key",)
+    ALWAYS_TYPED_ACTIONS = optparse.Option.ALWAYS_TYPED_ACTIONS + ("add_key",)
+
+    def take_action(self, action, dest, opt, value, values, parser):
+        if dest is None:
+            raise AssertionError("Destination can not be none")
+
+        if action == "add_key":
+            if self.metavar is None:
+                raise AssertionError("Metavar can not be none")
+
+            values.ensure_value(dest, {})[self.metavar.lower()] = value
+        elif action == "get_password":
+            values.ensure_value('password', getpass.getpass("Password for `admin`: "))
+        else:
+            super(CommonOptionChecker, self).take_action(
+                action, dest, opt, value, values, parser
             )
 
-            TYPE_CHECKER = copy.copy(optparse.Option.TYPE_CHECKER)
-            TYPE_CHECKER["tls_cert"] = check_tls_option
-            TYPE_CHECKER["db_table"] = check_db_table_option
-            TYPE_CHECKER["pos_int"] = check_positive_int
-            TYPE_CHECKER["file"] = check_existing_file
-            TYPE_CHECKER["new_file"] = check_new_file_location
-            TYPE_CHECKER["file_contents"] = file_contents
-
-            ACTIONS = optparse.Option.ACTIONS + ("add_key", "get_password")
-            STORE_ACTIONS = optparse.Option.STORE_ACTIONS + ("add_key", "get_password")
-            TYPED_ACTIONS = optparse.Option.TYPED_ACTIONS + ("add_key",)
-            ALWAYS_TYPED_ACTIONS = optparse.Option.ALWAYS_TYPED_ACTIONS + ("add_key",)
-
-            def take_action(self, action, dest, opt, value, values, parser):
-                if dest is None:
-                    raise AssertionError("Destination can not be none")
-
-                if action == "add_key":
-                    if self.metavar is None:
-                        raise AssertionError("Metavar can not be none")
-
-                    values.ensure_value(dest, {})[self.metavar.lower()] = value
-                elif action == "get_password":
-                    values.ensure_value('password', getpass.getpass("Password for `admin`: "))
-                else:
-                    super(CommonOptionChecker, self).take_action(
-                        action, dest, opt, value, values, parser
-                    )
 
+class CommonOptionsParser(optparse.OptionParser, object):
+
+    __retryQuery = None
+
+    def format_epilog(self, formatter):
+        return self.epilog or ""
+
+    def __init__(self, *args, **kwargs):
         kwargs["option_class"] = CommonOptionChecker
 
         # - default description to the module's __doc__
         if "description" not in kwargs:
-            # get calling module
-            caller = inspect.getmodule(inspect.stack()[1][0])
-            if caller.__doc__:
-                kwargs["description"] = caller.__doc__
+            # get calling module, without building the whole inspect.stack()
+            caller_doc = sys._getframe(1).f_globals.get("__doc__")
+            if caller_doc:
+                kwargs["description"] = caller_doc
 
         # -- add version
 
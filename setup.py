@@ -99,5 +99,8 @@ setuptools.setup(
     install_requires=[
         'six'
     ],
+    extras_require={
+        'orjson': ['orjson']
+    },
     test_suite='tests'
 )
@@ -0,0 +1,117 @@
+import datetime
+import json
+import uuid
+
+import pytest
+from mock import patch
+
+from rethinkdb import ast
+from rethinkdb.ast import ReQLDecoder, ReQLEncoder, expr
+
+PLAIN = b'{"t": 2, "r": [{"id": 1, "tags": ["a", {"b": null}]}]}'
+PSEUDO = b'{"t": 1, "r": [{"$reql_type$": "TIME", "epoch_time": 0, "timezone": "+00:00"}]}'
+
+
+@pytest.mark.unit
+@pytest.mark.skipif(ast.orjson is None, reason="orjson is not installed")
+class TestReQLDecoderOrjson(object):
+    def setup_method(self):
+        self.decoder = ReQLDecoder()
+
+    def test_plain_payload_decoded_with_orjson(self):
+        with patch.object(ast.orjson, "loads", wraps=ast.orjson.loads) as loads:
+            result = self.decoder.decode(PLAIN)
+
+        loads.assert_called_once_with(PLAIN)
+        assert result == json.loads(PLAIN.decode("utf-8"))
+
+    def test_pseudotype_payload_decoded_with_json(self):
+        with patch.object(ast.orjson, "loads") as loads:
+            result = self.decoder.decode(PSEUDO)
+
+        assert not loads.called
+        assert isinstance(result["r"][0], datetime.datetime)
+
+    def test_buffers_decoded(self):
+        for payload in (PLAIN, PSEUDO):
+            expected = self.decoder.decode(payload)
+
+            assert self.decoder.decode(memoryview(payload)) == expected
+            assert self.decoder.decode(bytearray(payload)) == expected
+            assert self.decoder.decode(payload.decode("utf-8")) == expected
+
+    def test_memoryview_not_copied(self):
+        view = memoryview(bytearray(b"xx" + PLAIN))[2:]
+
+        with patch.object(ast.orjson, "loads", wraps=ast.orjson.loads) as loads:
+            self.decoder.decode(view)
+
+        assert loads.call_args[0][0] is view
+
+    def test_orjson_rejected_payload_decoded_with_json(self):
+        assert self.decoder.decode(b'{"r": [18446744073709551616]}') == {
+            "r": [18446744073709551616]
+        }
+
+    def test_overridden_object_hook_applied_to_plain_objects(self):
+        class TaggingDecoder(ReQLDecoder):
+            def convert_pseudotype(self, obj):
+                obj["seen"] = True
+                return ReQLDecoder.convert_pseudotype(self, obj)
+
+        with patch.object(ast.orjson, "loads") as loads:
+            result = TaggingDecoder().decode(PLAIN)
+
+        assert not loads.called
+        assert result["seen"] is True
+        assert result["r"][0]["seen"] is True
+        assert result["r"][0]["tags"][1] == {"b": None, "seen": True}
+
+
+@pytest.mark.unit
+@pytest.mark.skipif(ast.orjson is None, reason="orjson is not installed")
+class TestReQLEncoderOrjson(object):
+    def setup_method(self):
+        self.encoder = ReQLEncoder()
+
+    def test_query_encoded_with_orjson(self):
+        query = [1, expr({"a": [1, 2.5, None, u"\u00e9"]}), {}]
+
+        with patch.object(ast.orjson, "dumps", wraps=ast.orjson.dumps) as dumps:
+            result = self.encoder.encode_bytes(query)
+
+        assert dumps.called
+        assert result == json.JSONEncoder.encode(self.encoder, query).encode("utf-8")
+
+    @pytest.mark.parametrize(
+        "value",
+        [
+            [1, [float("nan")]],
+            {"a": float("inf")},
+            expr([1, float("-inf")]),
+            expr({"a": float("nan")}),
+        ],
+    )
+    def test_non_finite_float_raises(self, value):
+        with pytest.raises(ValueError):
+            self.encoder.encode(value)
+
+    def test_uuid_raises(self):
+        with pytest.raises(TypeError):
+            self.encoder.encode([uuid.uuid4()])
+        with pytest.raises(TypeError):
+            self.encoder.encode(expr({"id": uuid.uuid4()}))
+
+    def test_overridden_default_gets_uuid(self):
+        class UUIDEncoder(ReQLEncoder):
+            def default(self, obj):
+                if isinstance(obj, uuid.UUID):
+                    return "uuid:" + str(obj)
+                return ReQLEncoder.default(self, obj)
+
+        value = uuid.UUID(int=1)
+
+        assert UUIDEncoder().encode([value]) == '["uuid:%s"]' % value
+
+    def test_large_integer_encoded(self):
+        assert self.encoder.encode_bytes([2 ** 70]) == b"[1180591620717411303424]"
@@ -0,0 +1,28 @@
+import pytest
+
+from rethinkdb import r
+from rethinkdb.errors import QueryPrinter
+
+
+@pytest.mark.unit
+class TestQueryPrinter(object):
+    def test_print_query(self):
+        query = r.table("users").get_all(1, 2, index="id")
+
+        printer = QueryPrinter(query, [1])
+
+        assert printer.print_query() == "r.table('users').get_all(1, 2, index='id')"
+        assert printer.print_carrots() == " " * 25 + "^" + " " * 16
+
+    def test_print_carrots_after_infix_operator(self):
+        query = r.branch(r.expr(1) == 1, "a", "b")
+
+        printer = QueryPrinter(query, [1])
+
+        assert printer.print_query() == "r.branch((r.expr(1) == r.expr(1)), 'a', 'b')"
+        assert printer.print_carrots() == " " * 35 + "^^^" + " " * 6
+
+    def test_print_carrots_whole_term(self):
+        query = r.expr("x").add("y")
+
+        assert QueryPrinter(query, []).print_carrots() == "^" * len(str(query))
@@ -7,7 +7,7 @@ import six
 from mock import ANY, Mock, call, patch
 
 from rethinkdb.errors import ReqlAuthError, ReqlDriverError
-from rethinkdb.handshake import HandshakeV1_0, LocalThreadCache
+from rethinkdb.handshake import HandshakeV1_0, LocalThreadCache, _xor_digests
 from rethinkdb.helpers import chain_to_bytes
 from rethinkdb.ql2_pb2 import VersionDummy
 
@@ -35,6 +35,25 @@ class TestLocalThreadCache(object):
         assert cached_value == self.cache_value
 
 
+@pytest.mark.unit
+def test_xor_digests():
+    digest_a = bytes(bytearray(range(32)))
+    digest_b = bytes(bytearray(range(255, 223, -1)))
+
+    expected = struct.pack(
+        "32B",
+        *(
+            a ^ b
+            for a, b in zip(
+                struct.unpack("32B", digest_a), struct.unpack("32B", digest_b)
+            )
+        )
+    )
+
+    assert _xor_digests(digest_a, digest_b) == expected
+    assert _xor_digests(digest_a, digest_a) == b"\x00" * 32
+
+
 @pytest.mark.unit
 class TestHandshake(object):
     def setup_method(self):
@@ -159,7 +178,7 @@ class TestHandshake(object):
     @patch("rethinkdb.handshake.base64")
     def test_init_connection(self, mock_base64):
         self.handshake._next_state = Mock()
-        encoded_string = "test"
+        encoded_string = b"test"
         mock_base64.standard_b64encode.return_value = encoded_string
         first_client_message = chain_to_bytes(
             "n=", self.handshake._username, ",r=", encoded_string
@@ -251,6 +270,19 @@ class TestHandshake(object):
         assert result == expected_result
         assert self.handshake._next_state.called is True
 
+    def test_get_scram_keys_cached(self):
+        self.handshake._pbkdf2_hmac = Mock(return_value=b"salted")
+        salt = b"client-and-server-keys-salt"
+
+        first_keys = self.handshake._get_scram_keys(salt, 2)
+        second_keys = self._get_handshake()._get_scram_keys(salt, 2)
+
+        assert first_keys == second_keys
+        assert len(first_keys) == 3
+        self.handshake._pbkdf2_hmac.assert_called_once_with(
+            "sha256", self.handshake._password, salt, 2
+        )
+
     def test_prepare_auth_request_invalid_nonce(self):
         self.handshake._next_state = Mock()
         self.handshake._random_nonce = (
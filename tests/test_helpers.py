@@ -21,6 +21,13 @@ class TestDecodeUTF8Helper(object):
 
         assert decoded_string == string
 
+    def test_decode_memoryview(self):
+        buffer = memoryview(bytearray(b"iron \xc3\xa9"))
+
+        decoded_string = decode_utf8(buffer)
+
+        assert decoded_string == u"iron \xe9"
+
 
 @pytest.mark.unit
 class TestChainToBytesHelper(object):
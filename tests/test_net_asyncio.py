@@ -0,0 +1,145 @@
+import struct
+
+import pytest
+from mock import Mock, patch
+
+from rethinkdb.errors import ReqlDriverError
+
+try:
+    import asyncio
+
+    from rethinkdb.asyncio_net import net_asyncio
+except (ImportError, AttributeError, SyntaxError):
+    net_asyncio = None
+
+pytestmark = pytest.mark.skipif(
+    net_asyncio is None, reason="the asyncio connection cannot be imported"
+)
+
+
+def frame(token, payload):
+    return struct.pack("<qL", token, len(payload)) + payload
+
+
+@pytest.mark.unit
+class TestResponseProtocol(object):
+    def setup_method(self):
+        self.loop = asyncio.new_event_loop()
+        self.responses = []
+        self.instance = Mock(_closing=False, _io_loop=self.loop)
+        self.instance._create_future = self.loop.create_future
+        # the payload is a view of the buffer, which is reused afterwards
+        self.instance._handle_response.side_effect = lambda token, payload: (
+            self.responses.append((token, bytes(payload)))
+        )
+        self.protocol = net_asyncio.ResponseProtocol(self.instance)
+
+    def teardown_method(self):
+        self.loop.close()
+
+    def feed(self, data, chunk_size=None):
+        while data:
+            buf = self.protocol.get_buffer(-1)
+            size = min(len(buf), len(data), chunk_size or len(data))
+            buf[:size] = data[:size]
+            data = data[size:]
+            self.protocol.buffer_updated(size)
+
+    def test_fragmented_handshake_messages(self):
+        first = self.protocol.read_handshake_message()
+
+        self.feed(b'{"success":')
+        assert not first.done()
+
+        self.feed(b'true}\0{"auth')
+        assert first.result() == b'{"success":true}'
+
+        second = self.protocol.read_handshake_message()
+        assert not second.done()
+
+        self.feed(b'":1}\0', chunk_size=1)
+        assert second.result() == b'{"auth":1}'
+
+    def test_handshake_messages_in_one_read(self):
+        self.feed(b"first\0second\0")
+
+        assert self.protocol.read_handshake_message().result() == b"first"
+        assert self.protocol.read_handshake_message().result() == b"second"
+
+    def test_frames_in_one_read(self):
+        self.protocol.handshake_done()
+
+        self.feed(frame(1, b"[1]") + frame(2, b"") + frame(3, b'{"r":[]}'))
+
+        assert self.responses == [(1, b"[1]"), (2, b""), (3, b'{"r":[]}')]
+
+    def test_frame_split_across_reads(self):
+        self.protocol.handshake_done()
+
+        self.feed(frame(1, b"abc") + frame(2, b"defgh"), chunk_size=5)
+
+        assert self.responses == [(1, b"abc"), (2, b"defgh")]
+
+    def test_frame_larger_than_buffer(self):
+        payload = b"x" * 200000
+        self.protocol.handshake_done()
+
+        self.feed(frame(1, payload) + frame(2, b"y"), chunk_size=4096)
+
+        assert self.responses == [(1, payload), (2, b"y")]
+
+    def test_data_received(self):
+        self.protocol.handshake_done()
+
+        self.protocol.data_received(frame(1, b"abc") + frame(2, b"de")[:7])
+        self.protocol.data_received(frame(2, b"de")[7:])
+
+        assert self.responses == [(1, b"abc"), (2, b"de")]
+
+    def test_connection_lost_fails_handshake_message(self):
+        message = self.protocol.read_handshake_message()
+
+        self.protocol.connection_lost(None)
+
+        assert self.protocol.at_eof
+        with pytest.raises(ReqlDriverError):
+            message.result()
+
+    def test_connection_lost_with_error_fails_handshake_message(self):
+        message = self.protocol.read_handshake_message()
+        error = OSError("reset")
+
+        self.protocol.connection_lost(error)
+
+        assert message.exception() is error
+
+    def test_connection_lost_closes_connection(self):
+        self.protocol.handshake_done()
+
+        with patch.object(net_asyncio.asyncio, "ensure_future") as ensure_future:
+            self.protocol.connection_lost(None)
+
+        ensure_future.assert_called_once_with(
+            self.instance.close.return_value, loop=self.loop
+        )
+        assert isinstance(
+            self.instance.close.call_args[1]["exception"], ReqlDriverError
+        )
+
+    def test_failed_response_not_replayed(self):
+        error = ValueError("bad response")
+        self.instance._handle_response.side_effect = [None, error, None]
+        self.protocol.handshake_done()
+
+        with patch.object(net_asyncio.asyncio, "ensure_future") as ensure_future:
+            self.feed(frame(1, b"a") + frame(2, b"b") + frame(3, b"c"))
+            self.feed(frame(4, b"d"))
+
+        assert self.instance._handle_response.call_count == 2
+        self.instance.close.assert_called_once_with(exception=error)
+        assert ensure_future.call_count == 1
+
+    def test_protocol_has_no_instance_dict(self):
+        assert not hasattr(self.protocol, "__dict__")
+        with pytest.raises(AttributeError):
+            self.protocol.unknown = None
@@ -1,6 +1,19 @@
+"""Unit tests for the utils_common module"""
+
+import optparse
+import os
+import threading
+
 import pytest
+from mock import Mock, patch
+
+from rethinkdb import ast, errors, utils_common
 
-from rethinkdb import utils_common
+
+@pytest.fixture(autouse=True)
+def connection_pool():
+    yield
+    utils_common.close_pool()
 
 
 @pytest.fixture
@@ -72,3 +85,231 @@ def test_option_parser_db_table_only_db(parser):
 def test_option_parser_db_table_fail(parser):
     with pytest.raises(SystemExit):
         parser.parse_args(["--export="], connect=False)
+
+
+@patch("rethinkdb.utils_common.net.make_connection")
+def test_retry_query_conn_cached(mock_make_connection):
+    retry_query = utils_common.RetryQuery({"host": "localhost", "port": 28015})
+
+    conn = retry_query.conn(test_connection=False)
+
+    assert retry_query.conn(test_connection=False) is conn
+    assert mock_make_connection.call_count == 1
+
+
+@patch("rethinkdb.utils_common.net.make_connection")
+def test_retry_query_conn_pooled(mock_make_connection):
+    mock_make_connection.side_effect = lambda *args, **kwargs: Mock()
+    options = {"host": "localhost", "port": 28015, "user": "admin"}
+
+    conn = utils_common.RetryQuery(dict(options)).conn(test_connection=False)
+    other = utils_common.RetryQuery(dict(options)).conn(test_connection=False)
+    options["user"] = "other"
+    different = utils_common.RetryQuery(options).conn(test_connection=False)
+
+    assert other is conn
+    assert different is not conn
+    assert mock_make_connection.call_count == 2
+
+
+@patch("rethinkdb.utils_common.net.make_connection")
+def test_retry_query_conn_pooled_per_options(mock_make_connection):
+    mock_make_connection.side_effect = lambda *args, **kwargs: Mock()
+    options = {"host": "localhost", "port": 28015, "user": "admin"}
+
+    plain = utils_common.RetryQuery(dict(options)).conn(test_connection=False)
+    tls = utils_common.RetryQuery(
+        dict(options, ssl={"ca_certs": "/tmp/ca.pem"})
+    ).conn(test_connection=False)
+    other_ca = utils_common.RetryQuery(
+        dict(options, ssl={"ca_certs": "/tmp/other.pem"})
+    ).conn(test_connection=False)
+    password = utils_common.RetryQuery(dict(options, password="secret")).conn(
+        test_connection=False
+    )
+    timeout = utils_common.RetryQuery(dict(options, timeout=5)).conn(
+        test_connection=False
+    )
+
+    assert len(set(map(id, (plain, tls, other_ca, password, timeout)))) == 5
+    assert mock_make_connection.call_count == 5
+
+
+@patch("rethinkdb.utils_common.net.make_connection")
+def test_close_pool(mock_make_connection):
+    retry_query = utils_common.RetryQuery({"host": "localhost", "port": 28015})
+    conn = retry_query.conn(test_connection=False)
+
+    utils_common.close_pool()
+
+    conn.close.assert_called_once_with(noreply_wait=False)
+    retry_query.conn(test_connection=False)
+    assert mock_make_connection.call_count == 2
+
+
+@patch("rethinkdb.utils_common._getpid")
+@patch("rethinkdb.utils_common.net.make_connection")
+def test_retry_query_conn_after_fork(mock_make_connection, mock_getpid):
+    mock_make_connection.side_effect = lambda *args, **kwargs: Mock()
+    retry_query = utils_common.RetryQuery({"host": "localhost", "port": 28015})
+
+    mock_getpid.return_value = 1
+    conn = retry_query.conn(test_connection=False)
+    mock_getpid.return_value = 2
+
+    assert retry_query.conn(test_connection=False) is not conn
+    assert mock_make_connection.call_count == 2
+
+
+@patch("rethinkdb.utils_common.time.sleep")
+@patch("rethinkdb.utils_common.net.make_connection")
+def test_retry_query_backoff(mock_make_connection, mock_sleep):
+    query = Mock(spec=ast.RqlQuery)
+    query.run.side_effect = errors.ReqlDriverError("boom")
+    retry_query = utils_common.RetryQuery({"host": "localhost", "port": 28015})
+
+    with pytest.raises(RuntimeError):
+        retry_query("test", query, times=3, base_delay=1, max_delay=1.5)
+
+    assert query.run.call_count == 3
+    assert mock_sleep.call_count == 2
+    delays = [args[0] for args, _ in mock_sleep.call_args_list]
+    assert 0 <= delays[0] <= 1
+    assert 0 <= delays[1] <= 1.5
+
+
+@patch("rethinkdb.utils_common.time.sleep")
+@patch("rethinkdb.utils_common.net.make_connection")
+def test_retry_query_connection_error(mock_make_connection, mock_sleep):
+    mock_make_connection.side_effect = errors.ReqlDriverError("refused")
+    query = Mock(spec=ast.RqlQuery)
+    retry_query = utils_common.RetryQuery({"host": "localhost", "port": 28015})
+
+    with pytest.raises(RuntimeError) as exc:
+        retry_query("test", query, times=2)
+
+    assert "Error connecting for during 'test': refused" in str(exc.value)
+    assert query.run.called is False
+
+
+@pytest.mark.parametrize(
+    "version_string,minimum_version,expected",
+    [
+        ("rethinkdb 2.4.1~0bionic (GCC 7.4.0)", "1.6", True),
+        ("rethinkdb 2.3.6", "2.3.7", False),
+        ("rebirthdb 2.3.7", "2.3.7", True),
+        ("rethinkdb 10.0.0", "9.1", True),
+    ],
+)
+def test_check_minimum_version(version_string, minimum_version, expected):
+    options = Mock()
+    options.retryQuery.return_value = version_string
+
+    result = utils_common.check_minimum_version(
+        options, minimum_version, raise_exception=False
+    )
+
+    assert result is expected
+
+
+def test_check_minimum_version_incompatible():
+    options = Mock()
+    options.retryQuery.return_value = "rethinkdb 1.5.0"
+
+    with pytest.raises(RuntimeError):
+        utils_common.check_minimum_version(options, "1.6")
+
+
+def test_retry_query_invalid_port():
+    with pytest.raises(AssertionError):
+        utils_common.RetryQuery({"host": "localhost", "port": "0"})
+
+
+def test_retry_query_port_coerced():
+    connect_options = {"host": "localhost", "port": "28015"}
+
+    utils_common.RetryQuery(connect_options)
+
+    assert connect_options["port"] == 28015
+
+
+@patch("rethinkdb.utils_common.net.make_connection")
+def test_retry_query_conn_per_thread(mock_make_connection):
+    mock_make_connection.side_effect = lambda *args, **kwargs: Mock()
+    retry_query = utils_common.RetryQuery({"host": "localhost", "port": 28015})
+    connections = []
+
+    def worker():
+        connections.append(retry_query.conn(test_connection=False))
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+    worker()
+
+    assert connections[0] is not connections[1]
+
+
+def test_print_progress(capsys):
+    utils_common.print_progress(0.5, indent=2, read=10, write=5, force=True)
+
+    out, _ = capsys.readouterr()
+    assert out == "\r  [%s%s]  50%% r: 10 w: 5\x1b[K" % ("=" * 20, " " * 20)
+
+
+def test_print_progress_throttled(capsys):
+    utils_common.print_progress(0.5, force=True)
+    utils_common.print_progress(0.51)
+    utils_common.print_progress(1.0)
+
+    out, _ = capsys.readouterr()
+    assert out.count("\r") == 2
+    assert out.endswith("[%s] 100%%\x1b[K" % ("=" * 40))
+
+
+def test_check_existing_file(tmpdir):
+    path = tmpdir.join("data.json")
+    path.write("[]")
+
+    result = utils_common.check_existing_file(None, "--file", str(path))
+
+    assert result == os.path.realpath(str(path))
+
+
+def test_check_existing_file_missing(tmpdir):
+    with pytest.raises(optparse.OptionValueError):
+        utils_common.check_existing_file(None, "--file", str(tmpdir.join("missing")))
+
+
+def test_option_parser_description_from_caller():
+    opt_parser = utils_common.CommonOptionsParser()
+
+    assert opt_parser.description == __doc__
+
+
+@patch("rethinkdb.utils_common.net.make_connection")
+def test_retry_query_conn_closed(mock_make_connection):
+    mock_make_connection.side_effect = lambda *args, **kwargs: Mock()
+    retry_query = utils_common.RetryQuery({"host": "localhost", "port": 28015})
+    conn = retry_query.conn()
+
+    conn.is_open.return_value = False
+
+    assert retry_query.conn() is not conn
+    assert conn.run.called is False
+    assert mock_make_connection.call_count == 2
+
+
+@patch("rethinkdb.utils_common.time.sleep")
+@patch("rethinkdb.utils_common.net.make_connection")
+def test_retry_query_reconnects_after_error(mock_make_connection, mock_sleep):
+    mock_make_connection.side_effect = lambda *args, **kwargs: Mock()
+    query = Mock(spec=ast.RqlQuery)
+    query.run.side_effect = [errors.ReqlDriverError("boom"), "result"]
+    retry_query = utils_common.RetryQuery({"host": "localhost", "port": 28015})
+
+    assert retry_query("test", query, times=2) == "result"
+
+    first_conn, second_conn = [args[0] for args, _ in query.run.call_args_list]
+    assert first_conn is not second_conn
+    first_conn.close.assert_called_once_with(noreply_wait=False)